@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark and golden check.
+
+    python bench_preprocess.py [--root datasets/scrapes] [--repeat 5]
+
+Checks that preprocess.parse_post_file gives exactly the same Post/Comment output
+as the original regex-based parser (kept below as the reference) for every scrape
+file, then times raw file reads, the reference parser and the current parser, and
+reports how many bytes the loaded corpus takes per post.
+Exits with status 1 if any file parses differently.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from preprocess import Comment, Post, _find_post_files, _parse_int, iter_posts, parse_post_file
+
+
+# ----------------------------
+# Reference parser (regex split chain, as originally in preprocess.py)
+# ----------------------------
+def _get_field(lines: List[str], prefix: str) -> Optional[str]:
+    # Example: "Post Title: xyz"
+    for ln in lines:
+        if ln.startswith(prefix):
+            return ln[len(prefix):].strip()
+    return None
+
+def _extract_post_content(full_text: str) -> Tuple[str, str]:
+    """
+    Returns (metadata_block, content_and_comments_block)
+    """
+    marker = "\n\nPost Content:\n"
+    if marker in full_text:
+        meta, rest = full_text.split(marker, 1)
+        return meta.strip(), rest.strip()
+    marker2 = "\nPost Content:\n"
+    if marker2 in full_text:
+        meta, rest = full_text.split(marker2, 1)
+        return meta.strip(), rest.strip()
+    # if missing, treat all as meta
+    return full_text.strip(), ""
+
+def _extract_comments_block(content_and_more: str) -> Tuple[str, str]:
+    """
+    Returns (content_text, comments_block)
+    """
+    m = re.search(r"\n\s*Top\s+\d+\s+comments:\s*\n", content_and_more)
+    if not m:
+        return content_and_more.strip(), ""
+    content = content_and_more[:m.start()].strip()
+    comments = content_and_more[m.end():].strip()
+    return content, comments
+
+def _parse_comments(comments_block: str) -> List[Comment]:
+    if not comments_block:
+        return []
+
+    parts = re.split(r"\n\s*Comment\s+\d+\s*:\s*\n", "\n" + comments_block)
+    parts = [p.strip() for p in parts if p.strip()]
+
+    comments: List[Comment] = []
+    for p in parts:
+        lines = p.split("\n")
+
+        author = None
+        score = None
+        created = None
+
+        comment_text_lines: List[str] = []
+        in_comment_text = False
+
+        for ln in lines:
+            s = ln.strip()
+
+            if s.startswith("Author:"):
+                author = s[len("Author:"):].strip()
+                in_comment_text = False
+                continue
+
+            if s.startswith("Score:"):
+                score = _parse_int(s)
+                in_comment_text = False
+                continue
+
+            if s.startswith("Created UTC:"):
+                created = s[len("Created UTC:"):].strip()
+                in_comment_text = False
+                continue
+
+            if s.startswith("Comment:"):
+                in_comment_text = True
+                comment_text_lines.append(s[len("Comment:"):].lstrip())
+                continue
+
+            # Keep collecting multi-line comment text until we hit another known field
+            if in_comment_text:
+                comment_text_lines.append(ln)
+
+        text = "\n".join(comment_text_lines).strip()
+        if text:  # only keep real comments
+            comments.append(Comment(author=author, text=text, score=score, created_utc=created))
+
+    return comments
+
+def legacy_parse_post_file(path: Path) -> Post:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    meta_block, rest = _extract_post_content(text)
+
+    meta_lines = [ln.strip() for ln in meta_block.split("\n") if ln.strip()]
+
+    title = _get_field(meta_lines, "Post Title:") or ""
+    author = _get_field(meta_lines, "Author:")
+    score = _parse_int(_get_field(meta_lines, "Score:") or "")
+    url = _get_field(meta_lines, "URL:") or ""
+    num_comments = _parse_int(_get_field(meta_lines, "Number of comments:") or "")
+    created = _get_field(meta_lines, "Created UTC:")
+
+    content_text, comments_block = _extract_comments_block(rest)
+    comments = _parse_comments(comments_block)
+
+    # subreddit folder under reddit/scrapes/
+    subreddit = path.parent.name.replace("scrape_", "", 1)
+
+    return Post(
+        subreddit=subreddit,
+        title=title,
+        author=author,
+        score=score,
+        url=url,
+        num_comments=num_comments,
+        created_utc=created,
+        content=content_text,
+        comments=comments,
+    )
+
+
+# ----------------------------
+# Checks
+# ----------------------------
+def golden_check(files: List[Path]) -> int:
+    mismatches = 0
+    for f in files:
+        if parse_post_file(f) != legacy_parse_post_file(f):
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"[MISMATCH] {f}")
+    return mismatches
+
+
+def best_time(fn: Callable[[Path], object], files: List[Path], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for f in files:
+            fn(f)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def memory_per_post(root: str) -> Tuple[int, int]:
+    """
+    Bytes held by the fully loaded corpus (Post objects with all comments), and the post count.
+    """
+    tracemalloc.start()
+    posts = list(iter_posts(root, cache=False))
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, len(posts)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default="datasets/scrapes")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    files = _find_post_files(args.root)
+    if not files:
+        sys.exit(1)
+    total_mb = sum(f.stat().st_size for f in files) / 1e6
+
+    mismatches = golden_check(files)
+    print(f"\ngolden check: {len(files) - mismatches}/{len(files)} files identical")
+
+    print(f"\n--- {len(files)} files, {total_mb:.1f} MB, best of {args.repeat} ---")
+    for name, fn in (
+        ("read_bytes", Path.read_bytes),
+        ("reference parser", legacy_parse_post_file),
+        ("parse_post_file", parse_post_file),
+    ):
+        t = best_time(fn, files, args.repeat)
+        print(f"{name:18s} {t * 1000:8.1f} ms  {len(files) / t:9.0f} files/s  {total_mb / t:7.1f} MB/s")
+
+    held, n_posts = memory_per_post(args.root)
+    print(f"\n--- memory: {n_posts} posts resident ---")
+    print(f"total {held / 1e6:.1f} MB  ({held / max(1, n_posts):.0f} bytes/post)")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
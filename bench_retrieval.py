@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark: recall against exact neighbours, latency and throughput.
+
+    python bench_retrieval.py [--backend numpy|helix|both] [--k 1,5,10,20,50] [--ef 64,128,1024]
+                              [--queries eval|titles] [--n-queries 500] [--workers 1]
+                              [--out results/bench_retrieval.json] [--min-recall 0.99]
+
+Replays the eval.py query set, or --n-queries post titles sampled from the corpus,
+against each backend for every k. Ground truth is exact float64 cosine top-k over the
+stored embeddings (embeddings/ from insert_data.py), so the numpy backend's recall
+measures float32 precision and the helix backend's recall measures the HNSW index
+(m / ef_construction / ef_search as configured in helix.toml) at each per-call --ef.
+A hit counts when it is at least as similar as the k-th exact neighbour, so posts
+sharing a vector (identical text) are interchangeable rather than misses.
+Reports recall@k, QPS and p50/p99 latency per (backend, ef, k), plus vector memory and per-query request size
+at float32 and float64, and writes everything as JSON with --out.
+Exits with status 1 if numpy recall drops below --min-recall at any k.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from embedding import vector_payload, vectorize_queries
+from eval import EMBED_BATCH_SIZE, EVAL_QUERIES
+from metrics import Histogram
+from retrieval import DEFAULT_EF, HelixBackend, NumpyBackend, clamp_ef
+
+HELIX_CONFIG = Path(__file__).resolve().parent / "helix.toml"
+HELIX_INSTANCE = "dev"
+# what the Helix CLI generates for settings helix.toml leaves out
+HNSW_DEFAULTS = {"m": 16, "ef_construction": 128, "ef_search": 768}
+TRUTH_CHUNK = 256  # queries per float64 similarity block
+TIE_TOLERANCE = 1e-9  # float64 slack when comparing a hit with the k-th true similarity
+
+
+def post_key(post: Dict[str, Any]):
+    return str(post.get("url")), str(post.get("title"))
+
+
+def hnsw_config(path: Path = HELIX_CONFIG, instance: str = HELIX_INSTANCE) -> Dict[str, int]:
+    """
+    Vector index settings of the local instance, as deployed from helix.toml.
+    """
+    config = {}
+    if path.exists():
+        with open(path, "rb") as f:
+            config = tomllib.load(f).get("local", {}).get(instance, {}).get("vector_config", {})
+    return {name: int(config.get(name, default)) for name, default in HNSW_DEFAULTS.items()}
+
+
+def unit_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = matrix.astype(np.float64)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    (len(queries), k) similarities of the k best rows per query, best first, at float64.
+    matrix and queries are unit rows (unit_rows).
+    """
+    out = np.empty((len(queries), min(k, len(matrix))), dtype=np.float64)
+    for start in range(0, len(queries), TRUTH_CHUNK):
+        sims = queries[start:start + TRUTH_CHUNK] @ matrix.T
+        out[start:start + len(sims)] = -np.sort(-sims, axis=1)[:, :out.shape[1]]
+    return out
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Share of the truth (k best exact similarities) matched by found (exact
+    similarities of the rows a search returned). Posts with identical text share a
+    vector, so any row at least as similar as the k-th true neighbour counts: which
+    member of a tie group a search returns is arbitrary.
+    """
+    if not len(truth):
+        return 1.0
+    hits = int(np.sum(found >= truth[-1] - TIE_TOLERANCE))
+    return min(hits, len(truth)) / len(truth)
+
+
+def load_queries(kind: str, n: int, seed: int, posts: List[Dict[str, Any]]) -> List[str]:
+    if kind == "eval":
+        return [text for _, text in EVAL_QUERIES]
+    titles = sorted({p["title"] for p in posts if p.get("title")})
+    random.Random(seed).shuffle(titles)
+    return titles[:n]
+
+
+def sweep(
+    search: Callable[[np.ndarray, int, Optional[int]], List[Optional[int]]],
+    vecs: np.ndarray,
+    similarity: Callable[[int, List[int]], np.ndarray],
+    truth: np.ndarray,
+    k: int,
+    ef: Optional[int],
+    workers: int,
+) -> Dict[str, float]:
+    """
+    Run every query at k and ef; recall against truth (exact similarities, already cut
+    to k), latency and QPS. search returns corpus rows (None for a post not in the
+    corpus), and similarity(query index, rows) gives their exact similarities.
+    """
+    def one(vec):
+        t0 = time.perf_counter()
+        found = search(vec, k, ef)
+        return found, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            timed = list(pool.map(one, vecs))
+    else:
+        timed = [one(v) for v in vecs]
+    wall = time.perf_counter() - t0
+
+    latency = Histogram()
+    for _, seconds in timed:
+        latency.observe(seconds)
+    recalls = [
+        recall(similarity(qi, [r for r in found if r is not None]), truth[qi])
+        for qi, (found, _) in enumerate(timed)
+    ]
+
+    return {
+        "k": k,
+        "ef": clamp_ef(k, ef) if ef is not None else None,
+        "recall": float(np.mean(recalls)),
+        "qps": len(vecs) / wall if wall else 0.0,
+        "p50_ms": latency.quantile(0.5) * 1000,
+        "p99_ms": latency.quantile(0.99) * 1000,
+        "mean_ms": latency.sum / max(1, latency.count) * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=("numpy", "helix", "both"), default="numpy")
+    ap.add_argument("--k", default="1,5,10,20,50", help="comma-separated k values")
+    ap.add_argument("--ef", default=str(DEFAULT_EF), help="comma-separated per-call search effort values (helix)")
+    ap.add_argument("--queries", choices=("eval", "titles"), default="eval")
+    ap.add_argument("--n-queries", type=int, default=500, help="titles sampled with --queries titles")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1, help="searches in flight")
+    ap.add_argument("--out", help="write results as JSON here")
+    ap.add_argument("--min-recall", type=float, default=0.99)
+    args = ap.parse_args()
+    ks = sorted({int(k) for k in args.k.split(",")})
+    efs = sorted({int(ef) for ef in args.ef.split(",")})
+
+    numpy_backend = NumpyBackend.from_corpus()
+    n, dim = numpy_backend.matrix.shape
+    texts = load_queries(args.queries, args.n_queries, args.seed, numpy_backend.posts)
+    vecs = vectorize_queries(texts, batch_size=EMBED_BATCH_SIZE)
+    matrix64, queries64 = unit_rows(numpy_backend.matrix), unit_rows(vecs)
+    truth = exact_top_k(matrix64, queries64, max(ks))
+
+    def similarity(qi: int, rows: List[int]) -> np.ndarray:
+        return matrix64[rows] @ queries64[qi]
+
+    f64_bytes = float(np.mean([len(json.dumps(v.astype(np.float64).tolist())) for v in vecs]))
+    f32_bytes = float(np.mean([len(json.dumps(vector_payload(v))) for v in vecs]))
+    report: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "queries": args.queries,
+        "n_queries": len(texts),
+        "posts": n,
+        "dim": dim,
+        "workers": args.workers,
+        "hnsw": hnsw_config(),
+        "precision": {
+            "float64": {"vectors_mb": n * dim * 8 / 1e6, "request_bytes": f64_bytes},
+            "float32": {"vectors_mb": n * dim * 4 / 1e6, "request_bytes": f32_bytes},
+        },
+        "results": {},
+    }
+
+    backends = {}
+    if args.backend in ("numpy", "both"):
+        # exact search has no effort knob
+        backends["numpy"] = (lambda vec, k, ef: numpy_backend.top_k(vec, k).tolist(), [None])
+    if args.backend in ("helix", "both"):
+        helix_backend = HelixBackend()
+        row_of = {post_key(p): i for i, p in enumerate(numpy_backend.posts)}
+        backends["helix"] = (
+            lambda vec, k, ef: [row_of.get(post_key(p)) for p in helix_backend.search_lite(vec, k, ef)],
+            efs,
+        )
+
+    print(f"\n--- {len(texts)} {args.queries} queries, {n} posts, dim {dim}, hnsw {report['hnsw']} ---")
+    print(f"float64 {n * dim * 8 / 1e6:7.1f} MB vectors  {f64_bytes / 1e3:6.1f} kB/request")
+    print(f"float32 {n * dim * 4 / 1e6:7.1f} MB vectors  {f32_bytes / 1e3:6.1f} kB/request")
+    print(f"\n{'backend':8s} {'ef':>5s} {'k':>4s} {'recall':>8s} {'qps':>9s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for name, (search, backend_efs) in backends.items():
+        rows = []
+        for ef in backend_efs:
+            for k in ks:
+                row = sweep(search, vecs, similarity, truth[:, :k], k, ef, args.workers)
+                rows.append(row)
+                print(
+                    f"{name:8s} {row['ef'] if row['ef'] is not None else '-':>5} {k:4d} {row['recall']:8.4f} "
+                    f"{row['qps']:9.1f} {row['p50_ms']:8.2f} {row['p99_ms']:8.2f}"
+                )
+        report["results"][name] = rows
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[INFO] results written to {args.out}")
+
+    low = [r for r in report["results"].get("numpy", []) if r["recall"] < args.min_recall]
+    if low:
+        print(f"\nfloat32 recall below {args.min_recall} at k = {[r['k'] for r in low]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
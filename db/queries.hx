@@ -2,7 +2,7 @@ QUERY upload_a_post(
     subreddit: String,
     title: String,
     content: String,
-    vector: [F64],
+    vector: [F32],
     url: String,
     score: I32,
     comments: [String]
@@ -16,16 +16,81 @@ QUERY upload_a_post(
         comments: comments,
     })
 
-    vec <- AddV<Content>(vector)
+    vec <- AddV<Content>(vector, {subreddit: subreddit})
     AddE<EmbeddingOf>::From(post_node)::To(vec)
 
     RETURN "success"
 
+QUERY upload_posts(
+    posts: [{
+        subreddit: String,
+        title: String,
+        content: String,
+        vector: [F32],
+        url: String,
+        score: I32,
+        comments: [String]
+    }]
+) =>
+    FOR {subreddit, title, content, vector, url, score, comments} IN posts {
+        post_node <- AddN<Post>({
+            subreddit: subreddit,
+            title: title,
+            content: content,
+            url: url,
+            score: score,
+            comments: comments,
+        })
+
+        vec <- AddV<Content>(vector, {subreddit: subreddit})
+        AddE<EmbeddingOf>::From(post_node)::To(vec)
+    }
+
+    RETURN "success"
+
 QUERY get_all_posts() =>
     posts <- N<Post>
     RETURN posts
 
-QUERY search_posts_vec(query: [F64], k: I32) =>
-    vecs <- SearchV<Content>(query, k)
+// ef is the per-call search effort: the index collects max(ef, ef_search) candidates
+// and the best k are kept. Callers clamp it to k <= ef <= retrieval.MAX_EF.
+QUERY search_posts_vec(query: [F32], k: I32, ef: I32) =>
+    vecs <- SearchV<Content>(query, ef)::RANGE(0, k)
+    posts <- vecs::In<EmbeddingOf>
+    RETURN posts
+
+// search_posts_vec without the bodies: only the fields a ranking needs, plus each
+// hit's vector distance. posts and vecs are in the same order (one Content per Post).
+// Fetch full posts for the hits actually used with get_post_by_id.
+QUERY search_posts_vec_lite(query: [F32], k: I32, ef: I32) =>
+    vecs <- SearchV<Content>(query, ef)::RANGE(0, k)
+    posts <- vecs::In<EmbeddingOf>
+    RETURN posts::{id, subreddit, title, url, score}, vecs::{distance: score}
+
+// search_posts_vec / search_posts_vec_lite within the given subreddits. The filter is
+// applied inside the index search (PREFILTER on Content.subreddit), so k hits come
+// back whenever the scope holds at least k posts.
+QUERY search_posts_vec_in(query: [F32], k: I32, ef: I32, subreddits: [String]) =>
+    vecs <- SearchV<Content>(query, ef)::PREFILTER(_::{subreddit}::IS_IN(subreddits))::RANGE(0, k)
     posts <- vecs::In<EmbeddingOf>
     RETURN posts
+
+QUERY search_posts_vec_lite_in(query: [F32], k: I32, ef: I32, subreddits: [String]) =>
+    vecs <- SearchV<Content>(query, ef)::PREFILTER(_::{subreddit}::IS_IN(subreddits))::RANGE(0, k)
+    posts <- vecs::In<EmbeddingOf>
+    RETURN posts::{id, subreddit, title, url, score}, vecs::{distance: score}
+
+// Direct lookup of one post by id; retrieval.get_post_by_id sends one per hit.
+QUERY get_post_by_id(id: ID) =>
+    post <- N<Post>(id)
+    RETURN post
+
+// BM25 over the Post text properties and vector search, each to depth k, in one
+// request. Both lists are returned as whole nodes (with ids) and fused client-side
+// with reciprocal rank fusion (retrieval.rrf_fuse). ef is the vector search effort,
+// as in search_posts_vec.
+QUERY search_posts_hybrid(text: String, query: [F32], k: I32, ef: I32) =>
+    bm25_posts <- SearchBM25<Post>(text, k)
+    vecs <- SearchV<Content>(query, ef)::RANGE(0, k)
+    vec_posts <- vecs::In<EmbeddingOf>
+    RETURN bm25_posts, vec_posts
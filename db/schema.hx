@@ -8,7 +8,8 @@ N::Post {
 }
 
 V::Content {
-    content: [F64]
+    content: [F32],
+    subreddit: String,
 }
 
 E::EmbeddingOf {
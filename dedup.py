@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate post detection, run between load_all_posts and embedding.
+
+    python dedup.py [--root datasets/scrapes] [--report results/dedup_report.json]
+
+Scrapes of different time windows and cross-posts put the same post into the corpus
+several times. Two posts are merged when they have
+  - the same normalized URL (reddit permalinks reduced to the post id), or
+  - the same normalized title and near-identical content, or
+  - near-identical content on its own (MinHash estimate of word-shingle Jaccard
+    similarity >= CONTENT_SIMILARITY; candidates come from LSH banding).
+Each cluster keeps its highest-scored post. The report lists every merged cluster.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from preprocess import PostTuple, load_all_posts
+
+DEDUP_REPORT = "results/dedup_report.json"
+SHINGLE_WORDS = 3
+MIN_CONTENT_WORDS = 20  # shorter contents are too generic to match on content alone
+NUM_PERM = 64
+BANDS = 16  # NUM_PERM / BANDS rows per band; candidate pairs share at least one band
+CONTENT_SIMILARITY = 0.8
+TITLE_CONTENT_SIMILARITY = 0.5  # enough when the normalized titles are equal too
+
+_PRIME = 4294967291  # largest prime below 2**32
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|ref|ref_source|share_id|context|fbclid|gclid)$")
+_REDDIT_POST_RE = re.compile(r"(?:^|\.)(?:reddit\.com|redd\.it)$")
+_REDDIT_ID_RE = re.compile(r"/(?:comments|gallery)/([a-z0-9]+)")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_url(url: str) -> str:
+    """
+    URL with case, "www.", tracking parameters, fragment and trailing slash removed;
+    reddit permalinks and gallery links (any subreddit, any slug) become "reddit:<post id>".
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    if _REDDIT_POST_RE.search(host):
+        m = _REDDIT_ID_RE.search(parts.path.lower())
+        if m:
+            return f"reddit:{m.group(1)}"
+        if host == "redd.it" and parts.path.strip("/"):
+            return f"reddit:{parts.path.strip('/').lower()}"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k.lower())])
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, "")).removeprefix("//")
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(_WORD_RE.findall((title or "").lower()))
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class MinHasher:
+    """
+    NUM_PERM min-hashes of a shingle set under random affine hashes mod a prime.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: List[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(items)), dtype=np.uint64)
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return False
+        self.parent[max(ri, rj)] = min(ri, rj)
+        return True
+
+
+def find_duplicates(posts: List[PostTuple]) -> List[Tuple[int, int, str]]:
+    """
+    (i, j, reason) for every pair of posts judged the same post, enough to connect
+    each duplicate cluster. reason is "url", "title+content <sim>", "title, no content"
+    or "content <sim>".
+    """
+    edges: List[Tuple[int, int, str]] = []
+    uf = _UnionFind(len(posts))
+
+    def link(i: int, j: int, reason: str) -> None:
+        if uf.union(i, j):
+            edges.append((i, j, reason))
+
+    first: Dict[str, int] = {}
+    for i, (_, _, _, url, _, _) in enumerate(posts):
+        key = normalize_url(url)
+        if key:
+            if key in first:
+                link(first[key], i, "url")
+            else:
+                first[key] = i
+
+    hasher = MinHasher()
+    signatures: Dict[int, np.ndarray] = {}
+    for i, (_, _, content, _, _, _) in enumerate(posts):
+        items = shingles(content)
+        if items:
+            signatures[i] = hasher.signature(items)
+
+    def similarity(i: int, j: int) -> float:
+        return float(np.mean(signatures[i] == signatures[j]))
+
+    titles: Dict[str, List[int]] = {}
+    for i, (_, title, _, _, _, _) in enumerate(posts):
+        key = normalize_title(title)
+        if key:
+            titles.setdefault(key, []).append(i)
+    for members in titles.values():
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if i in signatures and j in signatures:
+                    sim = similarity(i, j)
+                    if sim >= TITLE_CONTENT_SIMILARITY:
+                        link(i, j, f"title+content {sim:.2f}")
+                elif not posts[i][2].strip() and not posts[j][2].strip():
+                    link(i, j, "title, no content")
+
+    rows = NUM_PERM // BANDS
+    long_enough = [i for i in signatures if len(_WORD_RE.findall(posts[i][2])) >= MIN_CONTENT_WORDS]
+    for band in range(BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for i in long_enough:
+            buckets.setdefault(signatures[i][band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    if uf.find(i) != uf.find(j):
+                        sim = similarity(i, j)
+                        if sim >= CONTENT_SIMILARITY:
+                            link(i, j, f"content {sim:.2f}")
+    return edges
+
+
+def _describe(post: PostTuple) -> Dict[str, Any]:
+    subreddit, title, _, url, score, _ = post
+    return {"subreddit": subreddit, "title": title, "url": url, "score": score}
+
+
+def dedup_posts(posts: List[PostTuple], report_path: Optional[str] = DEDUP_REPORT) -> List[PostTuple]:
+    """
+    posts with each duplicate cluster reduced to its highest-scored post (the
+    earliest one on ties), in the original order. Writes the clusters to report_path
+    unless it is None.
+    """
+    edges = find_duplicates(posts)
+    uf = _UnionFind(len(posts))
+    for i, j, _ in edges:
+        uf.union(i, j)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(posts)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    keep = {max(members, key=lambda i: (posts[i][4], -i)) for members in clusters.values()}
+    deduped = [p for i, p in enumerate(posts) if i in keep]
+    merged = sum(1 for members in clusters.values() if len(members) > 1)
+    print(f"[INFO] Dedup: {len(posts)} posts -> {len(deduped)} ({len(posts) - len(deduped)} duplicates in {merged} clusters)")
+
+    if report_path is not None:
+        reasons: Dict[int, List[Tuple[int, int, str]]] = {}
+        for i, j, reason in edges:
+            reasons.setdefault(uf.find(i), []).append((i, j, reason))
+        report = {
+            "posts": len(posts),
+            "kept": len(deduped),
+            "clusters": [
+                {
+                    "kept": _describe(posts[next(i for i in members if i in keep)]),
+                    "merged": [_describe(posts[i]) for i in members if i not in keep],
+                    "links": [
+                        {"a": posts[i][3], "b": posts[j][3], "reason": reason}
+                        for i, j, reason in reasons.get(root, [])
+                    ],
+                }
+                for root, members in clusters.items() if len(members) > 1
+            ],
+        }
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[INFO] Dedup report written to {report_path}")
+
+    return deduped
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default="datasets/scrapes")
+    ap.add_argument("--report", default=DEDUP_REPORT)
+    args = ap.parse_args()
+    dedup_posts(load_all_posts(args.root), report_path=args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from tqdm import tqdm
+from transformers import AutoTokenizer, AutoModel
+
+from cache import CACHE_DIR, DiskCache, LRUCache
+
+MODEL_NAME = "mixedbread-ai/mxbai-embed-large-v1"
+MAX_LENGTH = 512
+QUERY_CACHE_SIZE = 4096  # query embeddings kept in memory
+QUERY_CACHE_PATH = CACHE_DIR / "query_embeddings.sqlite"
+
+_lock = threading.Lock()
+_loaded: Optional[Tuple[Any, Any, str]] = None
+_tokenizer: Optional[Any] = None
+load_seconds: Optional[float] = None  # how long the first get_model() call took
+
+
+def get_tokenizer() -> Any:
+    """
+    The model's tokenizer alone, for counting tokens without loading the weights.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """
+    Token count of each text, without special tokens.
+    """
+    if not texts:
+        return []
+    return [len(ids) for ids in get_tokenizer()(list(texts), add_special_tokens=False)["input_ids"]]
+
+
+def get_model() -> Tuple[Any, Any, str]:
+    """
+    (tokenizer, model, device), loaded on first use and shared by every caller in
+    the process. Scripts that never embed never load the model.
+    """
+    global _loaded, load_seconds
+    if _loaded is None:
+        tokenizer = get_tokenizer()
+        with _lock:
+            if _loaded is None:
+                t0 = time.perf_counter()
+                model = AutoModel.from_pretrained(MODEL_NAME)
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                model.to(device)
+                model.eval()
+                load_seconds = time.perf_counter() - t0
+                print(f"loaded {MODEL_NAME} on {device} in {load_seconds:.1f}s")
+                _loaded = (tokenizer, model, device)
+    return _loaded
+
+
+class QueryEmbeddingCache:
+    """
+    Query embeddings: a bounded in-memory LRU in front of a persistent SQLite store.
+    Keys cover the model name, max_length and the text, so changing either misses.
+    """
+
+    def __init__(self, path=QUERY_CACHE_PATH, maxsize: int = QUERY_CACHE_SIZE):
+        self.memory = LRUCache(maxsize)
+        self.disk = DiskCache(path)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(f"{MODEL_NAME}\0{MAX_LENGTH}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        vec = self.memory.get(key)
+        if vec is not None:
+            self.memory_hits += 1
+            return vec
+        raw = self.disk.get(key)
+        if raw is not None:
+            self.disk_hits += 1
+            vec = np.frombuffer(raw, dtype=np.float32)
+            self.memory.put(key, vec)
+            return vec
+        self.misses += 1
+        return None
+
+    def put(self, text: str, vec) -> None:
+        key = self.key(text)
+        vec = np.asarray(vec, dtype=np.float32)
+        self.memory.put(key, vec)
+        self.disk.put(key, vec.tobytes())
+
+    def stats(self) -> Dict[str, int]:
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+query_cache = QueryEmbeddingCache()
+
+
+def vector_payload(vec) -> List[float]:
+    """
+    vec as a JSON-ready list for a [F32] query parameter. Values are rounded to
+    float32 and cut to 9 significant digits, enough to round-trip any float32,
+    so the server parses back exactly the vector the model produced at about
+    half the bytes of a full-precision double.
+    """
+    return [float(f"{x:.9g}") for x in np.asarray(vec, dtype=np.float32).tolist()]
+
+
+def vectorize_text(text, use_cache: bool = True):
+    """
+    Embedding of one text as a list of floats. Looked up in query_cache first
+    unless use_cache is False.
+    """
+    if use_cache:
+        vec = query_cache.get(text)
+        if vec is not None:
+            return vec.tolist()
+
+    tokenizer, model, device = get_model()
+    inputs = tokenizer(
+            text,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=MAX_LENGTH
+    ).to(device)
+
+    with torch.no_grad():
+        outputs = model(**inputs)
+        embedding = outputs.last_hidden_state[:, 0, :].squeeze().tolist()
+
+    if use_cache:
+        query_cache.put(text, embedding)
+    return embedding
+
+
+def vectorize_batch(texts: List[str], batch_size: int = 32, max_length: int = MAX_LENGTH, progress: bool = False) -> np.ndarray:
+    """
+    Embed many texts at once. Returns a (len(texts), dim) float32 matrix in input order.
+
+    Texts are tokenized once, sorted by token length and cut into batches, so each
+    batch is only padded up to its own longest member instead of max_length.
+    """
+    tokenizer, model, device = get_model()
+    dim = model.config.hidden_size
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    if not texts:
+        return out
+
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    # longest first: a batch that does not fit in memory fails right away, not at the end
+    order = sorted(range(len(texts)), key=lambda i: lengths[i], reverse=True)
+
+    batches = range(0, len(order), batch_size)
+    for start in (tqdm(batches) if progress else batches):
+        idx = order[start:start + batch_size]
+        features = {key: [encoded[key][i] for i in idx] for key in encoded.keys()}
+        inputs = tokenizer.pad(features, padding=True, return_tensors="pt").to(device)
+
+        with torch.no_grad():
+            outputs = model(**inputs)
+            out[idx] = outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+
+    return out
+
+
+def vectorize_queries(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """
+    vectorize_batch for queries: cached texts are served from query_cache and only
+    the misses go through the model (in length-bucketed batches).
+    """
+    vecs: List[Optional[np.ndarray]] = [query_cache.get(t) for t in texts]
+    todo = list(dict.fromkeys(t for t, v in zip(texts, vecs) if v is None))
+    if todo:
+        fresh = dict(zip(todo, vectorize_batch(todo, batch_size=batch_size)))
+        for t, v in fresh.items():
+            query_cache.put(t, v)
+        vecs = [fresh[t] if v is None else v for t, v in zip(texts, vecs)]
+
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(np.stack(vecs), dtype=np.float32)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDINGS_DIR = "embeddings"
+VECTORS_FILE = "vectors.npy"
+INDEX_FILE = "index.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def text_hash(text: str) -> str:
+    """
+    Key of an embedded text. Posts with identical text share one row.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding store:
+      <root>/vectors.npy  float32 matrix, one row per embedded text, memory-mapped on load
+      <root>/index.json   row keys (text_hash of the embedded text) plus metadata
+      <root>/manifest.json  post id -> text_hash, written by sync()
+    """
+
+    def __init__(self, root: str | Path, keys: List[str], vectors: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        if vectors.shape[0] != len(keys):
+            raise ValueError(f"{len(keys)} keys for {vectors.shape[0]} vectors in {root}")
+        self.root = Path(root)
+        self.keys = keys
+        self.vectors = vectors
+        self.meta = meta or {}
+        self.rows = {k: i for i, k in enumerate(keys)}
+
+    @classmethod
+    def load(cls, root: str | Path) -> EmbeddingStore:
+        root = Path(root)
+        with open(root / INDEX_FILE, encoding="utf-8") as f:
+            index = json.load(f)
+        try:
+            vectors = np.load(root / VECTORS_FILE, mmap_mode="r")
+        except ValueError:
+            # numpy refuses to memory-map a zero-row matrix
+            vectors = np.load(root / VECTORS_FILE)
+        return cls(root, index["keys"], vectors, index.get("meta"))
+
+    @classmethod
+    def write(cls, root: str | Path, keys: List[str], vectors: np.ndarray, meta: Optional[Dict[str, Any]] = None) -> EmbeddingStore:
+        """
+        Replace the store at root. Both files are written next to the old ones and
+        swapped in afterwards, so a crash mid-write leaves the previous store intact.
+        """
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape[0] != len(keys):
+            raise ValueError(f"{len(keys)} keys for {vectors.shape[0]} vectors")
+
+        tmp_vectors = root / (VECTORS_FILE + ".tmp")
+        tmp_index = root / (INDEX_FILE + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, vectors)
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump({"keys": list(keys), "meta": meta or {}}, f)
+        os.replace(tmp_vectors, root / VECTORS_FILE)
+        os.replace(tmp_index, root / INDEX_FILE)
+
+        return cls.load(root)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def get(self, key: str) -> np.ndarray:
+        try:
+            return self.vectors[self.rows[key]]
+        except KeyError:
+            raise KeyError(f"no embedding for {key} in {self.root}") from None
+
+    def lookup(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Rows for the given texts, in the given order. Raises KeyError if any is missing.
+        """
+        hashes = [text_hash(t) for t in texts]
+        missing = [h for h in hashes if h not in self.rows]
+        if missing:
+            raise KeyError(f"{len(missing)} texts have no embedding in {self.root}")
+        return np.asarray(self.vectors[[self.rows[h] for h in hashes]])
+
+    @classmethod
+    def sync(
+        cls,
+        root: str | Path,
+        texts: Iterable[Tuple[str, str]],
+        embed: Callable[[List[str]], np.ndarray],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[EmbeddingStore, Dict[str, int]]:
+        """
+        Bring the store at root in line with texts, (post id, text to embed) pairs.
+        A post id seen more than once gets a "#n" suffix so every text is kept.
+
+        Only texts whose hash is not stored yet go through embed; rows no longer
+        referenced by any post are dropped. An existing store built with different
+        meta (model, max_length) is discarded and everything is re-embedded.
+        Returns the updated store and counts of what changed.
+        """
+        root = Path(root)
+        meta = meta or {}
+
+        old: Optional[EmbeddingStore] = None
+        old_manifest: Dict[str, str] = {}
+        if (root / INDEX_FILE).exists():
+            old = cls.load(root)
+            if old.meta != meta:
+                print(f"[INFO] Embedding settings changed ({old.meta} -> {meta}), re-embedding everything.")
+                old = None
+            elif (root / MANIFEST_FILE).exists():
+                with open(root / MANIFEST_FILE, encoding="utf-8") as f:
+                    old_manifest = json.load(f)
+
+        manifest: Dict[str, str] = {}
+        by_hash: Dict[str, str] = {}
+        for post_id, t in texts:
+            key, n = post_id, 1
+            while key in manifest:
+                n += 1
+                key = f"{post_id}#{n}"
+            h = text_hash(t)
+            manifest[key] = h
+            by_hash[h] = t
+        needed = set(by_hash)
+
+        keep = [k for k in old.keys if k in needed] if old is not None else []
+        kept = set(keep)
+        todo = [h for h in by_hash if h not in kept]
+
+        report = {
+            "posts": len(manifest),
+            "new": sum(1 for p in manifest if p not in old_manifest),
+            "changed": sum(1 for p, h in manifest.items() if p in old_manifest and old_manifest[p] != h),
+            "removed": sum(1 for p in old_manifest if p not in manifest),
+            "embedded": len(todo),
+            "skipped": sum(1 for h in manifest.values() if h in kept),
+            "dropped": (len(old) - len(keep)) if old is not None else 0,
+        }
+
+        if old is not None and not todo and len(keep) == len(old):
+            store = old
+        else:
+            parts = []
+            if keep:
+                parts.append(np.asarray(old.vectors[[old.rows[k] for k in keep]]))
+            if todo:
+                parts.append(np.asarray(embed([by_hash[h] for h in todo]), dtype=np.float32))
+            vectors = np.concatenate(parts) if parts else np.empty((0, old.dim if old is not None else 0), dtype=np.float32)
+            store = cls.write(root, keep + todo, vectors, meta)
+
+        tmp_manifest = root / (MANIFEST_FILE + ".tmp")
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, root / MANIFEST_FILE)
+
+        return store, report
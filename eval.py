@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple, Optional
 from collections import defaultdict
 
-import helix
-import torch
-from transformers import AutoTokenizer, AutoModel
-
-from insert_data import vectorize_text
+from embedding import query_cache, vectorize_queries
+from metrics import Histogram, metrics
+from retrieval import MAX_EF, SEARCH_MODE, get_backend, get_router, retrieve
 
 
 # ----------------------------
@@ -17,6 +17,10 @@ from insert_data import vectorize_text
 # ----------------------------
 DB_LOCAL = True
 K = 10
+EMBED_BATCH_SIZE = 32 # queries per forward pass
+SEARCH_WORKERS = 8 # concurrent search requests; 1 runs them one after another
+SEARCH_EF = MAX_EF # HNSW search effort; offline evals can afford the maximum
+ROUTER_SWEEP = (1, 2, 3, 5) # router probe counts compared against searching everything
 
 SUBREDDIT_FIELD = "subreddit"
 
@@ -175,20 +179,6 @@ EVAL_QUERIES: List[Tuple[str, str]] = [
 ]
 
 
-# print(f"{lab:10s}  n={stats['n']:2d}  avg_recall@k={stats['avg_recall@k']:.3f}  hit@k={stats['hit_rate@k']:.3f}")
-class search_posts_vec(helix.Query):
-    def __init__(self, query_vec: List[float], k: int):
-        super().__init__()
-        self.query_vec = query_vec
-        self.k = k
-
-    def query(self) -> List[helix.Payload]:
-        return [{"query": self.query_vec, "k": self.k}]
-
-    def response(self, response):
-        return response
-
-
 # ----------------------------
 # Metrics
 # ----------------------------
@@ -219,17 +209,32 @@ def compute_recall(retrieved: List[str], label: str) -> float:
     return correct / len(retrieved)
 
 
-def run_eval(db: helix.Client, queries: List[Tuple[str, str]], k: int) -> Tuple[List[QueryResult], Dict[str, Any]]:
+def run_eval(
+    backend,
+    queries: List[Tuple[str, str]],
+    k: int,
+    workers: int = SEARCH_WORKERS,
+    mode: str = SEARCH_MODE,
+    ef: int = SEARCH_EF,
+) -> Tuple[List[QueryResult], Dict[str, Any]]:
     results: List[QueryResult] = []
 
-    for label, text in queries:
-        vec = vectorize_text(text)
-        res = db.query(search_posts_vec(vec, k))
+    # embed the whole query set in batches, then search with up to `workers` requests in flight;
+    # pool.map keeps the responses in query order
+    with metrics.timer("embed_batch"):
+        vecs = vectorize_queries([text for _, text in queries], batch_size=EMBED_BATCH_SIZE)
 
-        # Helix response shape (from your print):
-        # res[0]["posts"] -> list of post dicts
-        posts = res[0].get("posts", []) if res else []
+    def search(text: str, vec) -> List[Dict[str, Any]]:
+        with metrics.timer("search"):
+            # only the subreddit is scored, so vector mode skips the post bodies
+            posts = retrieve(backend, text, vec, k, mode, ef, lite=True)
+        metrics.observe("retrieved_posts", len(posts))
+        return posts
 
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        responses = list(pool.map(search, [text for _, text in queries], vecs))
+
+    for (label, text), posts in zip(queries, responses):
         retrieved_labels = []
         for p in posts:
             p = p
@@ -259,6 +264,8 @@ def run_eval(db: helix.Client, queries: List[Tuple[str, str]], k: int) -> Tuple[
 
     summary = {
         "k": k,
+        "mode": mode,
+        "ef": ef,
         "total_queries": len(results),
         "overall": {
             "avg_recall@k": sum(r.recall_at_k for r in results) / max(1, len(results)),
@@ -277,18 +284,63 @@ def run_eval(db: helix.Client, queries: List[Tuple[str, str]], k: int) -> Tuple[
     return results, summary
 
 
+def router_tradeoff(
+    backend,
+    queries: List[Tuple[str, str]],
+    k: int,
+    probes_list: Tuple[int, ...] = ROUTER_SWEEP,
+    ef: int = SEARCH_EF,
+) -> List[Dict[str, Any]]:
+    """
+    Vector search routed to the top `probes` subreddits, for each probe count, against
+    searching everything (probes = 0): label hit rate and recall, overlap with the
+    unrouted top-k, and search latency. Queries run one at a time so latencies compare.
+    """
+    vecs = vectorize_queries([text for _, text in queries], batch_size=EMBED_BATCH_SIZE)
+    rows = []
+    reference: List[set] = []
+    for probes in (0,) + tuple(probes_list):
+        latency = Histogram()
+        hits, recalls, overlaps = 0, 0.0, 0.0
+        for i, ((label, text), vec) in enumerate(zip(queries, vecs)):
+            t0 = time.perf_counter()
+            posts = retrieve(backend, text, vec, k, "vector", ef, lite=True, probes=probes)
+            latency.observe(time.perf_counter() - t0)
+
+            labels = [extract_label(p, SUBREDDIT_FIELD) for p in posts]
+            hits += label in labels
+            recalls += compute_recall(labels, label)
+            ids = {p.get("id") for p in posts}
+            if probes == 0:
+                reference.append(ids)
+            overlaps += len(ids & reference[i]) / max(1, len(reference[i]))
+
+        n = max(1, len(queries))
+        rows.append({
+            "probes": probes,
+            "hit_rate@k": hits / n,
+            "avg_recall@k": recalls / n,
+            "overlap@k": overlaps / n,
+            "p50_ms": latency.quantile(0.5) * 1000,
+            "mean_ms": latency.sum / max(1, latency.count) * 1000,
+        })
+    return rows
+
+
 def main():
-    db = helix.Client(local=True, verbose=True)
+    backend = get_backend()
 
-    results, summary = run_eval(db, EVAL_QUERIES, K)
+    results, summary = run_eval(backend, EVAL_QUERIES, K)
 
     print("\n====================")
     print("RAG Retrieval Evaluation")
     print("====================")
+    print(f"backend = {backend.name}, mode = {summary['mode']}, ef = {summary['ef']}")
     print(f"k = {summary['k']}")
     print(f"total queries = {summary['total_queries']}")
     print(f"overall avg recall@k = {summary['overall']['avg_recall@k']:.3f}")
     print(f"overall hit rate@k   = {summary['overall']['hit_rate@k']:.3f}")
+    print(f"query embedding cache = {query_cache.stats()}")
 
     print("\n--- Per subreddit ---")
     for lab, stats in summary["per_label"].items():
@@ -307,6 +359,18 @@ def main():
         print("Q:", w.query)
         print("Top labels:", w.retrieved_labels[:10])
 
+    router = get_router()
+    if router is not None and summary["mode"] == "vector":
+        print(f"\n--- Subreddit routing ({len(router.subreddits)} subreddits, probes 0 = search everything) ---")
+        print(f"{'probes':>6s} {'hit@k':>7s} {'recall@k':>9s} {'overlap@k':>10s} {'p50 ms':>8s} {'mean ms':>8s}")
+        for row in router_tradeoff(backend, EVAL_QUERIES, K):
+            print(
+                f"{row['probes']:6d} {row['hit_rate@k']:7.3f} {row['avg_recall@k']:9.3f} "
+                f"{row['overlap@k']:10.3f} {row['p50_ms']:8.2f} {row['mean_ms']:8.2f}"
+            )
+
+    metrics.dump()
+
 
 
 if __name__ == "__main__":
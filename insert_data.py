@@ -1,17 +1,16 @@
 from preprocess import load_all_posts
-from typing import List, Tuple
-import json
+from dedup import dedup_posts
+from embedding import MAX_LENGTH, MODEL_NAME, vector_payload, vectorize_batch, vectorize_text  # vectorize_text: kept importable from here
+from embedding_store import EMBEDDINGS_DIR, EmbeddingStore, text_hash
+from router import SubredditRouter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import threading
 import helix
-import torch
 from tqdm import tqdm
-from transformers import AutoTokenizer, AutoModel
 
-tokenizer = AutoTokenizer.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-model = AutoModel.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"using device: {device}")
-model.to(device)
-model.eval()
+UPLOAD_BATCH_SIZE = 256 # posts per upload_posts request (one transaction each)
+UPLOAD_WORKERS = 4 # upload requests in flight
 
 class upload_a_post(helix.Query):
     def __init__(
@@ -48,39 +47,84 @@ class upload_a_post(helix.Query):
 
     def response(self, response): return response
 
-def vectorize_text(text):
-    inputs = tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=512
-    ).to(device)
+class upload_posts(helix.Query):
+    """
+    Many posts in one request; the server inserts the whole batch in one transaction.
+    Each post is a dict with the same fields as upload_a_post takes.
+    """
+    def __init__(self, posts: List[Dict[str, Any]]):
+        super().__init__()
+        self.posts = posts
+
+    def query(self) -> List[helix.Payload]:
+        return [{"posts": self.posts}]
+
+    def response(self, response): return response
 
-    with torch.no_grad():
-        outputs = model(**inputs)
-        embedding = outputs.last_hidden_state[:, 0, :].squeeze().tolist()
+def upload_in_batches(rows: List[Dict[str, Any]], batch_size: int = UPLOAD_BATCH_SIZE, workers: int = UPLOAD_WORKERS) -> None:
+    """
+    Send rows through upload_posts, batch_size posts per request and up to
+    workers requests in flight (one client per worker thread).
+    """
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    local = threading.local()
 
-    return embedding
+    def send(batch: List[Dict[str, Any]]) -> int:
+        if not hasattr(local, "db"):
+            local.db = helix.Client(local=True)
+        local.db.query(upload_posts(batch))
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(rows)) as bar:
+        for n in pool.map(send, batches):
+            bar.update(n)
+
+def post_key(subreddit: str, url: str) -> str:
+    """
+    Stable id of a post across scrapes, used by the embedding manifest.
+    """
+    return f"{subreddit}:{url}"
 
 if __name__ == "__main__":
-    data = load_all_posts("datasets/scrapes")
+    data = dedup_posts(load_all_posts("datasets/scrapes", workers=None))
 
     VECTORIZE = False # set to true then run then false then run again
 
     if VECTORIZE:
-        vecs = []
-        for _, _, content, _, _, _ in tqdm(data):
-            vec = vectorize_text(content)
-            vecs.append(vec)
-        with open("embeded_vectors.json", "w") as f: json.dump(vecs, f, indent=2)
+        texts = [(post_key(subreddit, url), content) for subreddit, _, content, url, _, _ in data]
+        store, report = EmbeddingStore.sync(
+            EMBEDDINGS_DIR,
+            texts,
+            lambda batch: vectorize_batch(batch, progress=True),
+            meta={"model": MODEL_NAME, "max_length": MAX_LENGTH},
+        )
+        print(
+            f"{report['posts']} posts: {report['new']} new, {report['changed']} changed, "
+            f"{report['removed']} removed; embedded {report['embedded']} texts, "
+            f"skipped {report['skipped']} already stored, dropped {report['dropped']} vectors"
+        )
+        print(f"stored {len(store)} vectors in {EMBEDDINGS_DIR}/")
+
+        router = SubredditRouter.build(
+            store.lookup(content for _, _, content, _, _, _ in data),
+            [subreddit for subreddit, _, _, _, _, _ in data],
+        )
+        router.save(EMBEDDINGS_DIR)
+        print(f"routing {len(router.subreddits)} subreddits through {len(router.labels)} centroids")
     else:
+        store = EmbeddingStore.load(EMBEDDINGS_DIR)
+        rows = [{
+            "subreddit": subreddit,
+            "title": title,
+            "content": content,
+            "vector": vector_payload(store.get(text_hash(content))),
+            "url": url,
+            "score": int(score),
+            "comments": [c for c, _ in comments],
+        } for subreddit, title, content, url, score, comments in data]
+        upload_in_batches(rows)
+
         db = helix.Client(local=True, verbose=True)
-        n_data = []
-        vecs = json.load(open("embeded_vectors.json"))
-        for (subreddit, title, content, url, score, comments), vec in tqdm(zip(data, vecs)):
-            comments = [c for c, _ in comments]
-            db.query(upload_a_post(subreddit, title, content, vec, url, score, comments))
 
         posts = db.query("get_all_posts")
         print(len(posts[0]["posts"]))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+OLLAMA_URL = "http://localhost:11434"
+KEEP_ALIVE = "30m"  # how long Ollama keeps a model loaded after a request
+OPTIONS: Dict[str, Any] = {}  # default generation options (temperature, num_ctx, num_predict, ...)
+POOL_SIZE = 8  # pooled connections; at least the number of concurrent requests
+
+
+@dataclass(slots=True)
+class Generation:
+    """
+    One finished generation. Durations are in seconds; token counts come from
+    Ollama's final stream message.
+    """
+    text: str
+    first_token: Optional[float]  # request sent -> first token received
+    total: float
+    prompt_tokens: int = 0
+    prompt_seconds: float = 0.0
+    tokens: int = 0
+    eval_seconds: float = 0.0
+    load_seconds: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.eval_seconds if self.eval_seconds else 0.0
+
+    @property
+    def prompt_tokens_per_second(self) -> float:
+        return self.prompt_tokens / self.prompt_seconds if self.prompt_seconds else 0.0
+
+    def summary(self) -> str:
+        first = f"{self.first_token:.2f}s" if self.first_token is not None else "-"
+        return (
+            f"first token {first}, total {self.total:.2f}s, "
+            f"prompt {self.prompt_tokens} tok at {self.prompt_tokens_per_second:.0f} tok/s, "
+            f"output {self.tokens} tok at {self.tokens_per_second:.1f} tok/s"
+            + (f", model load {self.load_seconds:.1f}s" if self.load_seconds >= 0.1 else "")
+        )
+
+
+class OllamaClient:
+    """
+    /api/generate over one pooled HTTP session, streaming tokens as they arrive.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        keep_alive: Optional[str] = KEEP_ALIVE,
+        options: Optional[Dict[str, Any]] = None,
+        pool_size: int = POOL_SIZE,
+    ):
+        self.url = base_url.rstrip("/") + "/api/generate"
+        self.keep_alive = keep_alive
+        self.options = dict(OPTIONS if options is None else options)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def _lines(response: requests.Response, timeout: Optional[float]) -> Iterator[bytes]:
+        # requests reports a read timeout in mid-stream as a ConnectionError
+        try:
+            yield from response.iter_lines()
+        except requests.ConnectionError as e:
+            if e.args and isinstance(e.args[0], ReadTimeoutError):
+                raise requests.Timeout(f"no data from Ollama for {timeout}s") from e
+            raise
+
+    def generate(
+        self,
+        prompt: str,
+        model: str,
+        on_token: Optional[Callable[[str], None]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Generation:
+        """
+        Generate a completion, calling on_token with each piece of text as it arrives.
+        With timeout, raises requests.Timeout if connecting or any single read takes
+        longer (including a stream that stalls after it has started), or once the whole
+        generation has taken longer, checked as each line arrives.
+        """
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": True}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        merged = {**self.options, **(options or {})}
+        if merged:
+            payload["options"] = merged
+
+        t0 = time.perf_counter()
+        first_token: Optional[float] = None
+        parts = []
+        final: Dict[str, Any] = {}
+        with self.session.post(self.url, json=payload, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API request failed with status {response.status_code}")
+            for line in self._lines(response, timeout):
+                if not line:
+                    continue
+                msg = json.loads(line)
+                if "error" in msg:
+                    raise Exception(f"Ollama API error: {msg['error']}")
+                piece = msg.get("response", "")
+                if piece:
+                    if first_token is None:
+                        first_token = time.perf_counter() - t0
+                    parts.append(piece)
+                    if on_token is not None:
+                        on_token(piece)
+                if msg.get("done"):
+                    # Ollama ends the stream right after this; read to the end rather than
+                    # break, so the connection is released to the pool instead of closed
+                    final = msg
+                    continue
+                if timeout is not None and time.perf_counter() - t0 > timeout:
+                    raise requests.Timeout(f"generation took longer than {timeout}s")
+
+        ns = 1e-9
+        return Generation(
+            text="".join(parts),
+            first_token=first_token,
+            total=time.perf_counter() - t0,
+            prompt_tokens=final.get("prompt_eval_count", 0),
+            prompt_seconds=final.get("prompt_eval_duration", 0) * ns,
+            tokens=final.get("eval_count", 0),
+            eval_seconds=final.get("eval_duration", 0) * ns,
+            load_seconds=final.get("load_duration", 0) * ns,
+        )
+
+
+client = OllamaClient()
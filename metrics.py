@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import functools
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+QUANTILES = (0.5, 0.95, 0.99)
+MAX_SAMPLES = 10_000  # per histogram; beyond this a uniform reservoir sample is kept
+# where dump() writes at the end of a run: *.prom for Prometheus text, anything else JSON;
+# unset prints a table instead
+METRICS_FILE = os.environ.get("METRICS_FILE")
+PROMETHEUS_PREFIX = "rag_"
+
+
+class Histogram:
+    """
+    Observations of one quantity: exact count/sum/min/max, and quantiles from up
+    to MAX_SAMPLES values (all of them for any run of ordinary length).
+    """
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.samples: List[float] = []
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            i = random.randrange(self.count)
+            if i < self.max_samples:
+                self.samples[i] = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Nearest-rank quantile of the kept samples.
+        """
+        if not self.samples:
+            return math.nan
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def summary(self) -> Dict[str, float]:
+        out = {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max}
+        for q in QUANTILES:
+            out[f"p{round(q * 100)}"] = self.quantile(q)
+        return out
+
+
+class Metrics:
+    """
+    Named histograms for one process. Stage durations go through timer() and are
+    stored as "<stage>_seconds"; other quantities (token counts, result counts,
+    payload bytes) through observe(). Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(float(value))
+
+    @contextmanager
+    def timer(self, stage: str, into: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """
+        Time the block as stage; the duration is also stored in into[stage] if given.
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            self.observe(f"{stage}_seconds", seconds)
+            if into is not None:
+                into[stage] = seconds
+
+    def timed(self, stage: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator form of timer().
+        """
+        def wrap(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        lines = []
+        for name, s in self.summary().items():
+            metric = prefix + name
+            lines.append(f"# TYPE {metric} summary")
+            for q in QUANTILES:
+                lines.append(f'{metric}{{quantile="{q}"}} {s[f"p{round(q * 100)}"]}')
+            lines.append(f"{metric}_sum {s['sum']}")
+            lines.append(f"{metric}_count {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_table(self) -> str:
+        lines = [f"{'metric':32s} {'count':>6s} {'p50':>10s} {'p95':>10s} {'p99':>10s} {'max':>10s}"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name:32s} {s['count']:6d} {s['p50']:10.4g} {s['p95']:10.4g} {s['p99']:10.4g} {s['max']:10.4g}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = METRICS_FILE) -> None:
+        """
+        Write everything recorded so far to path (Prometheus text for *.prom, JSON
+        otherwise), or print it as a table when no path is set.
+        """
+        if not self.histograms:
+            return
+        if path is None:
+            print("\n--- metrics ---")
+            print(self.to_table())
+            return
+        text = self.to_prometheus() if str(path).endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"[INFO] metrics written to {path}")
+
+
+metrics = Metrics()
@@ -16,22 +16,38 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import heapq
+import marshal
+import mmap
+import os
 import re
+import struct
+import sys
+import tempfile
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import BinaryIO, List, Tuple, Optional, Dict, Any, Iterator
 
 
 # Data structures
-@dataclass
+# slots keep per-object overhead down for a corpus that stays resident in long-running
+# jobs; subreddit and author names repeat across thousands of objects, so they are interned
+@dataclass(slots=True)
 class Comment:
     author: Optional[str]
     text: str
     score: Optional[int]
     created_utc: Optional[str]
 
+    def __post_init__(self):
+        if self.author is not None:
+            self.author = sys.intern(self.author)
 
-@dataclass
+
+@dataclass(slots=True)
 class Post:
     subreddit: str
     title: str
@@ -43,17 +59,23 @@ class Post:
     content: str
     comments: List[Comment]
 
+    def __post_init__(self):
+        self.subreddit = sys.intern(self.subreddit)
+        if self.author is not None:
+            self.author = sys.intern(self.author)
+
     def to_required_tuple(self, top_k: int) -> Tuple[str, str, str, int, List[Tuple[str, int]]]:
         """
         Return: title, content, URL, score, top_k_comments[(comment, score),...
         """
         post_score = int(self.score) if self.score is not None else 0
 
-        top = sorted(
+        # partial selection; same result and tie order as a stable descending sort
+        top = heapq.nlargest(
+            top_k,
             self.comments,
             key=lambda c: (c.score if c.score is not None else -10**9),
-            reverse=True,
-        )[:top_k]
+        )
 
         top_k_pairs = []
         for c in top:
@@ -70,142 +92,349 @@ def _parse_int(line: str) -> Optional[int]:
     m = _INT_RE.search(line)
     return int(m.group(0)) if m else None
 
-def _get_field(lines: List[str], prefix: str) -> Optional[str]:
-    # Example: "Post Title: xyz"
-    for ln in lines:
-        if ln.startswith(prefix):
-            return ln[len(prefix):].strip()
-    return None
-
-def _split_sections(text: str) -> Dict[str, str]:
+# Scrape file layout (see scraper.format_post_text):
+#   <metadata lines>            "Post Title: ...", "Author: ...", "Score: ...", ...
+#   Post Content:
+#   <content lines>
+#   Top N comments:
+#   Comment 1:                  followed by indented Author/Comment/Score/Created UTC lines
+_CONTENT_MARKER = "\n\nPost Content:\n"
+_CONTENT_MARKER_LOOSE = "\nPost Content:\n"
+# "Top N comments:" line that ends the post content; never the first or last line.
+# Patterns start at the newline before a line so the regex engine can skip ahead to
+# the next "\n" instead of trying every position.
+_TOP_COMMENTS_RE = re.compile(r"\n[^\S\n]*Top[^\S\n]+\d+[^\S\n]+comments:[^\S\n]*(?=\n)")
+# lines that mean something inside the comments section: a "Comment N:" header or a field
+_COMMENT_LINE_RE = re.compile(
+    r"\n[^\S\n]*(?:"
+    r"(?P<header>Comment[^\S\n]+\d+[^\S\n]*:[^\S\n]*$)"
+    r"|(?P<key>Author|Score|Created UTC|Comment):(?P<value>.*)$"
+    r")",
+    re.M,
+)
+_META_KEYS = {"Post Title", "Author", "Score", "URL", "Number of comments", "Created UTC"}
+
+
+def _parse_meta(meta_block: str) -> Dict[str, str]:
+    # "Key: value" lines, first occurrence of each key wins
+    fields: Dict[str, str] = {}
+    for ln in meta_block.split("\n"):
+        s = ln.strip()
+        key, sep, value = s.partition(":")
+        if sep and key in _META_KEYS and key not in fields:
+            fields[key] = value.strip()
+    return fields
+
+def _parse_comments(block: str) -> List[Comment]:
     """
-    Splits into sections keyed by headers
+    One pass over the comments section, which starts with a newline. Only header
+    and field lines are visited; comment text between them is sliced out in one piece.
     """
-    t = text.replace("\r\n", "\n").replace("\r", "\n")
-    return {"full": t}
+    comments: List[Comment] = []
+    author = score = created = None
+    text: List[str] = []
+    in_comment_text = False
+    pos = 0  # end of the last field line
+
+    for m in _COMMENT_LINE_RE.finditer(block):
+        key, value = m.group("key", "value")
+        if key is None and m.end() == len(block):
+            # a header needs a line after it; on the last line it is plain text
+            continue
+
+        if in_comment_text:
+            # the lines since the last field are more comment text
+            text.append(block[pos:m.start()])
+
+        if key is None:
+            # "Comment N:" starts the next comment
+            body = "".join(text).strip()
+            if body:  # only keep real comments
+                comments.append(Comment(author=author, text=body, score=score, created_utc=created))
+            author = score = created = None
+            text = []
+            in_comment_text = False
+        elif key == "Comment":
+            in_comment_text = True
+            value = value.strip()
+            text.append("\n" + value if text else value)
+        else:
+            value = value.strip()
+            if key == "Author":
+                author = value
+            elif key == "Score":
+                score = int(value) if value.isdigit() and value.isascii() else _parse_int(value)
+            else:
+                created = value
+            in_comment_text = False
+        pos = m.end()
+
+    if in_comment_text:
+        text.append(block[pos:])
+    body = "".join(text).strip()
+    if body:
+        comments.append(Comment(author=author, text=body, score=score, created_utc=created))
+
+    return comments
 
-def _extract_post_content(full_text: str) -> Tuple[str, str]:
+def _parse_body(body: str) -> Tuple[str, List[Comment]]:
     """
-    Returns (metadata_block, content_and_comments_block)
+    Split the text after "Post Content:" into (content_text, comments).
     """
-    marker = "\n\nPost Content:\n"
-    if marker in full_text:
-        meta, rest = full_text.split(marker, 1)
-        return meta.strip(), rest.strip()
-    marker2 = "\nPost Content:\n"
-    if marker2 in full_text:
-        meta, rest = full_text.split(marker2, 1)
-        return meta.strip(), rest.strip()
-    # if missing, treat all as meta
-    return full_text.strip(), ""
-
-def _extract_comments_block(content_and_more: str) -> Tuple[str, str]:
+    body = body.strip()
+    m = _TOP_COMMENTS_RE.search(body)
+    if m is None:
+        return body, []
+    return body[:m.start()].strip(), _parse_comments(body[m.end():])
+
+def parse_post_text(text: str, subreddit: str) -> Post:
     """
-    Returns (content_text, comments_block)
+    Parse the text of one scrape file. Line endings must already be "\n".
     """
-    m = re.search(r"\n\s*Top\s+\d+\s+comments:\s*\n", content_and_more)
-    if not m:
-        return content_and_more.strip(), ""
-    content = content_and_more[:m.start()].strip()
-    comments = content_and_more[m.end():].strip()
-    return content, comments
-
-def _parse_comments(comments_block: str) -> List[Comment]:
-    if not comments_block:
-        return []
-
-    parts = re.split(r"\n\s*Comment\s+\d+\s*:\s*\n", "\n" + comments_block)
-    parts = [p.strip() for p in parts if p.strip()]
-
-    comments: List[Comment] = []
-    for p in parts:
-        lines = p.split("\n")
-
-        author = None
-        score = None
-        created = None
-
-        comment_text_lines: List[str] = []
-        in_comment_text = False
-
-        for ln in lines:
-            s = ln.strip()
-
-            if s.startswith("Author:"):
-                author = s[len("Author:"):].strip()
-                in_comment_text = False
-                continue
-
-            if s.startswith("Score:"):
-                score = _parse_int(s)
-                in_comment_text = False
-                continue
-
-            if s.startswith("Created UTC:"):
-                created = s[len("Created UTC:"):].strip()
-                in_comment_text = False
-                continue
-
-            if s.startswith("Comment:"):
-                in_comment_text = True
-                comment_text_lines.append(s[len("Comment:"):].lstrip())
-                continue
-
-            # Keep collecting multi-line comment text until we hit another known field
-            if in_comment_text:
-                comment_text_lines.append(ln)
+    cut = text.find(_CONTENT_MARKER)
+    width = len(_CONTENT_MARKER)
+    if cut < 0:
+        cut = text.find(_CONTENT_MARKER_LOOSE)
+        width = len(_CONTENT_MARKER_LOOSE)
+    if cut < 0:
+        # if missing, treat all as meta
+        meta_block, body = text, ""
+    else:
+        meta_block, body = text[:cut], text[cut + width:]
+
+    fields = _parse_meta(meta_block)
+    content_text, comments = _parse_body(body)
 
-        text = "\n".join(comment_text_lines).strip()
-        if text:  # only keep real comments
-            comments.append(Comment(author=author, text=text, score=score, created_utc=created))
+    return Post(
+        subreddit=subreddit,
+        title=fields.get("Post Title") or "",
+        author=fields.get("Author"),
+        score=_parse_int(fields.get("Score") or ""),
+        url=fields.get("URL") or "",
+        num_comments=_parse_int(fields.get("Number of comments") or ""),
+        created_utc=fields.get("Created UTC"),
+        content=content_text,
+        comments=comments,
+    )
 
-    return comments
+def parse_post_buffer(buf: bytes | bytearray | memoryview | mmap.mmap, subreddit: str) -> Post:
+    """
+    Parse raw file bytes, e.g. a memory-mapped file. Decodes like Path.read_text
+    (utf-8, errors replaced, universal newlines).
+    """
+    text = str(buf, "utf-8", "replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return parse_post_text(text, subreddit)
 
 def parse_post_file(path: Path) -> Post:
-    text = path.read_text(encoding="utf-8", errors="replace")
-    meta_block, rest = _extract_post_content(text)
-
-    meta_lines = [ln.strip() for ln in meta_block.split("\n") if ln.strip()]
+    # subreddit folder under reddit/scrapes/
+    subreddit = path.parent.name.replace("scrape_", "", 1)
+    return parse_post_buffer(path.read_bytes(), subreddit)
+
+# Parsed-post cache
+PARSER_VERSION = 1  # bump whenever parse_post_text output changes; invalidates every PostCache
+CACHE_FILE = ".parsed_posts.cache"
+
+_INDEX_STR_COLUMNS = ("path",)
+_INDEX_INT_COLUMNS = ("mtime_ns", "size", "offset", "length")
+_POST_FIELDS = ("subreddit", "title", "author", "score", "url", "num_comments", "created_utc", "content")
+_COMMENT_FIELDS = ("author", "text", "score", "created_utc")
+_NULL_INT = -2**63  # stands for None in int columns
+_TRAILER = struct.Struct("<q")  # file offset of the index, in the last 8 bytes
+
+
+def _pack_str(values: List[Optional[str]]) -> Tuple[str, bytes]:
+    # one string per column plus the length of each value (-1 for None)
+    lengths = array("q", (-1 if v is None else len(v) for v in values))
+    return "".join(v for v in values if v is not None), lengths.tobytes()
+
+def _unpack_str(packed: Tuple[str, bytes]) -> List[Optional[str]]:
+    blob, raw = packed
+    lengths = array("q")
+    lengths.frombytes(raw)
+    out: List[Optional[str]] = []
+    pos = 0
+    for n in lengths:
+        if n < 0:
+            out.append(None)
+        else:
+            out.append(blob[pos:pos + n])
+            pos += n
+    return out
 
-    title = _get_field(meta_lines, "Post Title:") or ""
-    author = _get_field(meta_lines, "Author:")
-    score = _parse_int(_get_field(meta_lines, "Score:") or "")
-    url = _get_field(meta_lines, "URL:") or ""
-    num_comments = _parse_int(_get_field(meta_lines, "Number of comments:") or "")
-    created = _get_field(meta_lines, "Created UTC:")
+def _pack_int(values: List[Optional[int]]) -> bytes:
+    return array("q", (_NULL_INT if v is None else v for v in values)).tobytes()
 
-    content_text, comments_block = _extract_comments_block(rest)
-    comments = _parse_comments(comments_block)
+def _unpack_int(raw: bytes) -> List[Optional[int]]:
+    values = array("q")
+    values.frombytes(raw)
+    return [None if v == _NULL_INT else v for v in values]
 
-    # subreddit folder under reddit/scrapes/
-    subreddit = path.parent.name.replace("scrape_", "", 1)
+def _pack_post(post: Post) -> bytes:
+    return marshal.dumps((
+        tuple(getattr(post, name) for name in _POST_FIELDS),
+        tuple(tuple(getattr(cm, name) for name in _COMMENT_FIELDS) for cm in post.comments),
+    ))
 
+def _unpack_post(raw: bytes) -> Post:
+    fields, comments = marshal.loads(raw)
     return Post(
-        subreddit=subreddit,
-        title=title,
-        author=author,
-        score=score,
-        url=url,
-        num_comments=num_comments,
-        created_utc=created,
-        content=content_text,
-        comments=comments,
+        **dict(zip(_POST_FIELDS, fields)),
+        comments=[Comment(**dict(zip(_COMMENT_FIELDS, cm))) for cm in comments],
     )
 
-# loading point
-def load_all_posts(
-    root: str | Path = "reddit/scrapes",
-    top_k_comments: int = 4,
-) -> List[Tuple[str, str, str, str, int, List[Tuple[str, int]]]]:
+
+class PostCache:
     """
-    Returns:
-      (subreddit, title, content, url, score, [(comment_text, comment_score), ...])
+    Parsed posts of one scrape directory in a single file: one marshalled record
+    per post, then an index of packed columns (path as one string plus an int64
+    length array; mtime, size, record offset and record length as int64 arrays),
+    then the index's offset.
+
+    load() reads only the index. Records are read and decoded one at a time as
+    iter_posts asks for them, and newly parsed posts are spilled to a temporary
+    file as records, so neither a warm nor a cold run holds the corpus in memory.
+    save() rewrites the file by copying records, without decoding them.
+
+    Entries are keyed by path relative to the directory and are only used while the
+    file's mtime and size still match. A different PARSER_VERSION or Python version
+    discards the whole cache.
     """
+    STAMP = (PARSER_VERSION, marshal.version, tuple(sys.version_info[:2]))
+
+    def __init__(self, path: Path, root: Path):
+        self.path = path
+        self.root = root
+        self._prefix = len(str(root)) + 1
+        self.hits = 0
+        self.misses = 0
+        self._file: Optional[BinaryIO] = None  # the cache file being read
+        self._spill: Optional[BinaryIO] = None  # records of posts parsed in this run
+        self._rows: Dict[str, Tuple[int, int, int, int]] = {}  # key -> (mtime_ns, size, offset, length)
+        # entries seen in this run: key -> (mtime_ns, size, in_spill, offset, length)
+        self._live: Dict[str, Tuple[int, int, bool, int, int]] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, root: Path) -> PostCache:
+        cache = cls(root / CACHE_FILE, root)
+        try:
+            f = open(cache.path, "rb")
+        except OSError:
+            return cache
+        try:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            f.seek(_TRAILER.unpack(f.read(_TRAILER.size))[0])
+            index = marshal.load(f)
+            if not isinstance(index, dict) or index.get("stamp") != cls.STAMP:
+                print("[INFO] Parsed-post cache is from another parser version, ignoring it.")
+                f.close()
+                return cache
+            cols = {name: _unpack_str(index[name]) for name in _INDEX_STR_COLUMNS}
+            cols.update({name: _unpack_int(index[name]) for name in _INDEX_INT_COLUMNS})
+        except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error):
+            f.close()
+            return cache
+        cache._file = f
+        for key, *entry in zip(*(cols[name] for name in _INDEX_STR_COLUMNS + _INDEX_INT_COLUMNS)):
+            cache._rows[key] = tuple(entry)
+        return cache
+
+    def _key(self, path: Path) -> str:
+        # path is always under root (it comes from root.glob); Path.relative_to is slow
+        key = str(path)[self._prefix:]
+        return key if os.sep == "/" else key.replace(os.sep, "/")
+
+    def get(self, path: Path, st: os.stat_result) -> Optional[Post]:
+        key = self._key(path)
+        entry = self._rows.get(key)
+        if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+            self.misses += 1
+            return None
+        mtime, size, offset, length = entry
+        try:
+            post = _unpack_post(self._read(self._file, offset, length))
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._live[key] = (mtime, size, False, offset, length)
+        return post
+
+    def put(self, path: Path, st: os.stat_result, post: Post) -> None:
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        raw = _pack_post(post)
+        offset = self._spill.seek(0, os.SEEK_END)
+        self._spill.write(raw)
+        self._live[self._key(path)] = (st.st_mtime_ns, st.st_size, True, offset, len(raw))
+        self._dirty = True
+
+    @staticmethod
+    def _read(f: BinaryIO, offset: int, length: int) -> bytes:
+        f.seek(offset)
+        raw = f.read(length)
+        if len(raw) != length:
+            raise EOFError("truncated parsed-post cache record")
+        return raw
+
+    def save(self, complete: bool) -> None:
+        """
+        Write the cache if anything changed. After a complete scan, entries for
+        files that were not seen (deleted or renamed) are dropped; after a partial
+        scan they are kept.
+        """
+        try:
+            entries = dict(self._live)
+            if not complete:
+                for key, (mtime, size, offset, length) in self._rows.items():
+                    entries.setdefault(key, (mtime, size, False, offset, length))
+            if not self._dirty and len(entries) == len(self._rows):
+                return
+
+            cols: Dict[str, list] = {name: [] for name in _INDEX_STR_COLUMNS + _INDEX_INT_COLUMNS}
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            try:
+                with open(tmp, "wb") as out:
+                    for key, (mtime, size, in_spill, offset, length) in entries.items():
+                        cols["path"].append(key)
+                        cols["mtime_ns"].append(mtime)
+                        cols["size"].append(size)
+                        cols["offset"].append(out.tell())
+                        cols["length"].append(length)
+                        out.write(self._read(self._spill if in_spill else self._file, offset, length))
+                    index: Dict[str, Any] = {"stamp": self.STAMP}
+                    index.update({name: _pack_str(cols[name]) for name in _INDEX_STR_COLUMNS})
+                    index.update({name: _pack_int(cols[name]) for name in _INDEX_INT_COLUMNS})
+                    index_offset = out.tell()
+                    marshal.dump(index, out)
+                    out.write(_TRAILER.pack(index_offset))
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                os.replace(tmp, self.path)
+            except (OSError, EOFError) as e:
+                print(f"[WARN] Could not write parsed-post cache {self.path}: {e}")
+        finally:
+            for f in (self._file, self._spill):
+                if f is not None:
+                    f.close()
+            self._file = self._spill = None
+
+
+# loading point
+PostTuple = Tuple[str, str, str, str, int, List[Tuple[str, int]]]
+
+def _resolve_root(root: str | Path) -> Path:
     script_dir = Path(__file__).resolve().parent
     root_path = Path(root)
     if not root_path.is_absolute():
         root_path = (script_dir / root_path).resolve()
+    return root_path
 
+def _find_post_files(root: str | Path) -> List[Path]:
+    root_path = _resolve_root(root)
     print(f"[INFO] Scanning root: {root_path}")
     if not root_path.exists():
         print(f"[ERROR] Root folder does not exist: {root_path}")
@@ -237,21 +466,128 @@ def load_all_posts(
         print("[HINT] Your files might not be .txt or might not start with 'post'.")
         return []
 
+    files.sort(key=lambda p: p.parts)  # same order as sorting the Paths, without pathlib's slow __lt__
+
     # Show a few found files
     print("[INFO] Example files found:")
-    for f in sorted(files)[:5]:
+    for f in files[:5]:
         print("  -", f)
 
-    out = []
-    for f in sorted(files):
-        try:
-            post = parse_post_file(f)  # uses your parser
-            title, content, url, score, top = post.to_required_tuple(top_k_comments)
-            out.append((post.subreddit, title, content, url, score, top))
-        except Exception as e:
-            print(f"[WARN] Failed to parse {f}: {e}")
+    return files
 
-    return out
+def _load_post(path: Path) -> Optional[Post]:
+    try:
+        return parse_post_file(path)  # uses your parser
+    except Exception as e:
+        print(f"[WARN] Failed to parse {path}: {e}")
+        return None
+
+def _parse_chunk(paths: List[Path]) -> List[Optional[Post]]:
+    # runs in a worker process, so it has to be a module-level function
+    return [_load_post(p) for p in paths]
+
+def _to_tuple(post: Post, top_k_comments: int) -> PostTuple:
+    title, content, url, score, top = post.to_required_tuple(top_k_comments)
+    return (post.subreddit, title, content, url, score, top)
+
+def iter_posts(
+    root: str | Path = "reddit/scrapes",
+    workers: Optional[int] = 1,
+    chunksize: int = 64,
+    cache: bool = True,
+) -> Iterator[Post]:
+    """
+    Yields parsed Post objects in sorted path order, one at a time.
+
+    workers > 1 (None = one per CPU) parses files in a process pool. Only a couple
+    of chunks per worker are in flight at once, so memory stays bounded by the
+    chunk size rather than by the corpus when the consumer is slower than the parser.
+
+    With cache=True, files whose mtime and size match <root>/.parsed_posts.cache
+    are taken from it and only the rest are parsed; the cache is updated at the end.
+    """
+    files = _find_post_files(root)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    post_cache = PostCache.load(_resolve_root(root)) if cache and files else None
+    complete = False
+
+    def lookup(chunk: List[Path]) -> Tuple[List[os.stat_result], List[Optional[Post]]]:
+        stats = [f.stat() for f in chunk]
+        if post_cache is None:
+            return stats, [None] * len(chunk)
+        return stats, [post_cache.get(f, st) for f, st in zip(chunk, stats)]
+
+    def merge(chunk, stats, hits, parsed) -> Iterator[Post]:
+        parsed = iter(parsed)
+        for f, st, post in zip(chunk, stats, hits):
+            if post is None:
+                post = next(parsed)
+                if post is None:
+                    continue
+                if post_cache is not None:
+                    post_cache.put(f, st, post)
+            yield post
+
+    chunks = [files[i:i + chunksize] for i in range(0, len(files), chunksize)]
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                stats, hits = lookup(chunk)
+                parsed = [_load_post(f) for f, post in zip(chunk, hits) if post is None]
+                yield from merge(chunk, stats, hits, parsed)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                try:
+                    for chunk in chunks:
+                        stats, hits = lookup(chunk)
+                        todo = [f for f, post in zip(chunk, hits) if post is None]
+                        fut = pool.submit(_parse_chunk, todo) if todo else None
+                        pending.append((chunk, stats, hits, fut))
+                        if len(pending) >= 2 * workers:
+                            c, st, h, fut = pending.popleft()
+                            yield from merge(c, st, h, fut.result() if fut else [])
+                    while pending:
+                        c, st, h, fut = pending.popleft()
+                        yield from merge(c, st, h, fut.result() if fut else [])
+                finally:
+                    # consumer stopped early: don't parse chunks nobody will read
+                    for *_, fut in pending:
+                        if fut is not None:
+                            fut.cancel()
+        complete = True
+    finally:
+        if post_cache is not None:
+            print(f"[INFO] Parsed-post cache: {post_cache.hits} hits, {post_cache.misses} parsed")
+            post_cache.save(complete)
+
+def iter_all_posts(
+    root: str | Path = "reddit/scrapes",
+    top_k_comments: int = 4,
+    workers: Optional[int] = 1,
+    chunksize: int = 64,
+    cache: bool = True,
+) -> Iterator[PostTuple]:
+    """
+    Yields the same tuples as load_all_posts, in the same (sorted path) order, one
+    at a time. See iter_posts for workers and cache.
+    """
+    for post in iter_posts(root, workers=workers, chunksize=chunksize, cache=cache):
+        yield _to_tuple(post, top_k_comments)
+
+def load_all_posts(
+    root: str | Path = "reddit/scrapes",
+    top_k_comments: int = 4,
+    workers: Optional[int] = 1,
+    cache: bool = True,
+) -> List[PostTuple]:
+    """
+    Returns:
+      (subreddit, title, content, url, score, [(comment_text, comment_score), ...])
+    """
+    return list(iter_all_posts(root, top_k_comments, workers=workers, cache=cache))
 
 
 #CLI test
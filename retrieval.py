@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import helix
+import numpy as np
+
+from embedding import vector_payload
+from dedup import dedup_posts
+from embedding_store import EMBEDDINGS_DIR, EmbeddingStore
+from metrics import metrics
+from preprocess import load_all_posts
+from router import SubredditRouter
+
+# "helix" searches the running Helix instance, "numpy" searches in process with no database
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "helix")
+# "vector" ranks by embedding only, "hybrid" fuses BM25 keyword and vector rankings
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "vector")
+CORPUS_ROOT = "datasets/scrapes"
+HYBRID_CANDIDATES = 50  # depth of each ranking fed into the fusion
+RRF_K = 60  # reciprocal rank fusion constant: score = sum 1 / (RRF_K + rank)
+# HNSW search effort per vector query (candidates collected before the best k are kept).
+# The deployed ef_search (helix.toml) is the floor; DEFAULT_EF suits interactive use,
+# offline evals pass MAX_EF.
+DEFAULT_EF = 128
+MAX_EF = 1024
+MAX_K = MAX_EF  # hits per vector query; never more than MAX_EF, so ef can always cover k
+# subreddits searched per vector query, picked by the centroid router built at ingest;
+# 0 searches everything
+ROUTER_PROBES = int(os.environ.get("ROUTER_PROBES", "0"))
+# what search_lite returns per hit (plus "distance"); full posts come from fetch()
+LITE_FIELDS = ("id", "subreddit", "title", "url", "score")
+
+
+def clamp_k(k: int) -> int:
+    """
+    k limited to MAX_K.
+    """
+    return min(k, MAX_K)
+
+
+def clamp_ef(k: int, ef: Optional[int] = None) -> int:
+    """
+    Search effort for a top-k query: ef (DEFAULT_EF if None), at least clamp_k(k),
+    at most MAX_EF.
+    """
+    return max(clamp_k(k), min(DEFAULT_EF if ef is None else ef, MAX_EF))
+
+
+class search_posts_vec(helix.Query):
+    def __init__(self, query_vec: List[float], k: int, ef: Optional[int] = None):
+        super().__init__()
+        self.query_vec = query_vec
+        self.k = clamp_k(k)
+        self.ef = clamp_ef(k, ef)
+
+    def query(self) -> List[helix.Payload]:
+        return [{"query": self.query_vec, "k": self.k, "ef": self.ef}]
+
+    def response(self, response):
+        return response
+
+
+class search_posts_hybrid(helix.Query):
+    def __init__(self, text: str, query_vec: List[float], k: int, ef: Optional[int] = None):
+        super().__init__()
+        self.text = text
+        self.query_vec = query_vec
+        self.k = clamp_k(k)
+        self.ef = clamp_ef(k, ef)
+
+    def query(self) -> List[helix.Payload]:
+        return [{"text": self.text, "query": self.query_vec, "k": self.k, "ef": self.ef}]
+
+    def response(self, response):
+        return response
+
+
+class search_posts_vec_lite(search_posts_vec):
+    """
+    Same parameters as search_posts_vec; returns projected hits and their distances.
+    """
+
+
+class search_posts_vec_in(search_posts_vec):
+    """
+    search_posts_vec restricted to the given subreddits, filtered inside the index search.
+    """
+    def __init__(self, query_vec: List[float], k: int, subreddits: List[str], ef: Optional[int] = None):
+        super().__init__(query_vec, k, ef)
+        self.subreddits = list(subreddits)
+
+    def query(self) -> List[helix.Payload]:
+        return [{**super().query()[0], "subreddits": self.subreddits}]
+
+
+class search_posts_vec_lite_in(search_posts_vec_in):
+    """
+    search_posts_vec_lite restricted to the given subreddits.
+    """
+
+
+class get_post_by_id(helix.Query):
+    """
+    One post per id, each looked up directly by id (one payload, so one request, per id).
+    """
+    def __init__(self, ids: List[str]):
+        super().__init__()
+        self.ids = ids
+
+    def query(self) -> List[helix.Payload]:
+        return [{"id": i} for i in self.ids]
+
+    def response(self, response):
+        return response
+
+
+def rrf_fuse(rankings: Sequence[Sequence[Hashable]], k: int, rrf_k: int = RRF_K) -> List[Hashable]:
+    """
+    Reciprocal rank fusion: the k items with the highest sum of 1 / (rrf_k + rank)
+    over all rankings (rank starting at 1). Ties keep first-seen order.
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused, key=fused.__getitem__, reverse=True)[:k]
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of texts, as postings arrays per term.
+    """
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        docs: Dict[str, List[int]] = {}
+        freqs: Dict[str, List[int]] = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                docs.setdefault(term, []).append(i)
+                freqs.setdefault(term, []).append(tf)
+
+        n = len(texts)
+        avgdl = float(lengths.mean()) if n else 0.0
+        self.n = n
+        self.k1 = k1
+        # per-document part of the BM25 denominator
+        self.norm = k1 * (1.0 - b + b * lengths / max(avgdl, 1e-9))
+        self.postings = {
+            term: (np.array(docs[term], dtype=np.int64), np.array(freqs[term], dtype=np.float32))
+            for term in docs
+        }
+        self.idf = {
+            term: math.log(1.0 + (n - len(d) + 0.5) / (len(d) + 0.5))
+            for term, d in docs.items()
+        }
+
+    def scores(self, text: str) -> np.ndarray:
+        out = np.zeros(self.n, dtype=np.float32)
+        for term in set(tokenize(text)):
+            if term not in self.postings:
+                continue
+            idx, tf = self.postings[term]
+            out[idx] += self.idf[term] * tf * (self.k1 + 1.0) / (tf + self.norm[idx])
+        return out
+
+    def top_k(self, text: str, k: int) -> np.ndarray:
+        """
+        Indices of the k best matching texts, best first; texts sharing no term are left out.
+        """
+        scores = self.scores(text)
+        idx = _top_indices(scores, k)
+        return idx[scores[idx] > 0]
+
+
+class HelixBackend:
+    """
+    Vector search through the search_posts_vec query of a Helix instance.
+    """
+    name = "helix"
+
+    def __init__(self, db: Optional[helix.Client] = None):
+        self.db = db if db is not None else helix.Client(local=True, verbose=True)
+
+    def search(self, vec, k: int, ef: Optional[int] = None, subreddits: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        if subreddits is None:
+            query = search_posts_vec(vector_payload(vec), k, ef)
+        else:
+            query = search_posts_vec_in(vector_payload(vec), k, subreddits, ef)
+        metrics.observe("search_request_bytes", len(json.dumps(query.query())))
+        res = self.db.query(query)
+        # res[0]["posts"] -> list of post dicts
+        return res[0].get("posts", []) if res else []
+
+    def search_lite(self, vec, k: int, ef: Optional[int] = None, subreddits: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        if subreddits is None:
+            query = search_posts_vec_lite(vector_payload(vec), k, ef)
+        else:
+            query = search_posts_vec_lite_in(vector_payload(vec), k, subreddits, ef)
+        metrics.observe("search_request_bytes", len(json.dumps(query.query())))
+        res = self.db.query(query)
+        res = res[0] if res else {}
+        # posts and vecs come back in the same order
+        return [
+            {**post, "distance": vec.get("distance")}
+            for post, vec in zip(res.get("posts", []), res.get("vecs", []))
+        ]
+
+    def fetch(self, ids: List[str]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        res = self.db.query(get_post_by_id(list(ids)))
+        by_id = {r["post"]["id"]: r["post"] for r in res or [] if r and r.get("post")}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def search_hybrid(self, text: str, vec, k: int, ef: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = search_posts_hybrid(text, vector_payload(vec), max(k, HYBRID_CANDIDATES), ef)
+        metrics.observe("search_request_bytes", len(json.dumps(query.query())))
+        res = self.db.query(query)
+        res = res[0] if res else {}
+        by_id: Dict[str, Dict[str, Any]] = {}
+        rankings = []
+        for field in ("bm25_posts", "vec_posts"):
+            ranking = []
+            for post in res.get(field, []):
+                by_id.setdefault(post["id"], post)
+                ranking.append(post["id"])
+            rankings.append(ranking)
+        return [by_id[i] for i in rrf_fuse(rankings, k)]
+
+
+class NumpyBackend:
+    """
+    Exact cosine search held in memory: post dicts plus a row-normalized float32
+    matrix, one row per post. top-k is one matrix-vector product and argpartition.
+    Rows are grouped by subreddit, so a scoped search multiplies only the slices of
+    the subreddits asked for. Returns post dicts shaped like the Helix response.
+    """
+    name = "numpy"
+
+    def __init__(self, posts: List[Dict[str, Any]], vectors: np.ndarray):
+        if len(posts) != len(vectors):
+            raise ValueError(f"{len(posts)} posts for {len(vectors)} vectors")
+        order = sorted(range(len(posts)), key=lambda i: str(posts[i].get("subreddit")))
+        self.posts = [posts[i] for i in order]
+        self.rows = {post.get("id", str(i)): i for i, post in enumerate(self.posts)}
+        self.slices: Dict[str, slice] = {}
+        for i, post in enumerate(self.posts):
+            current = self.slices.get(post.get("subreddit"))
+            self.slices[post.get("subreddit")] = slice(current.start if current else i, i + 1)
+        matrix = np.array(vectors, dtype=np.float32)[order]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.maximum(norms, 1e-12)
+        self._bm25: Optional[BM25Index] = None
+
+    @property
+    def bm25(self) -> BM25Index:
+        """
+        Keyword index over title and content, built on first hybrid search.
+        """
+        if self._bm25 is None:
+            self._bm25 = BM25Index([f"{p['title']}\n{p['content']}" for p in self.posts])
+        return self._bm25
+
+    @classmethod
+    def from_corpus(cls, root: str = CORPUS_ROOT, store_dir: str = EMBEDDINGS_DIR) -> NumpyBackend:
+        """
+        The same posts insert_data.py uploads, with vectors from its embedding store.
+        """
+        data = dedup_posts(load_all_posts(root), report_path=None)
+        store = EmbeddingStore.load(store_dir)
+        posts = [{
+            "id": str(i),
+            "subreddit": subreddit,
+            "title": title,
+            "content": content,
+            "url": url,
+            "score": int(score),
+            "comments": [c for c, _ in comments],
+        } for i, (subreddit, title, content, url, score, comments) in enumerate(data)]
+        return cls(posts, store.lookup(p["content"] for p in posts))
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        q = np.asarray(vec, dtype=np.float32)
+        return q / max(float(np.linalg.norm(q)), 1e-12)
+
+    def scores(self, vec) -> np.ndarray:
+        """
+        Cosine similarity of vec to every post.
+        """
+        return self.matrix @ self._unit(vec)
+
+    def top_k(self, vec, k: int, subreddits: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Row indices of the k most similar posts, best first, only among the given
+        subreddits if any are given.
+        """
+        if subreddits is None:
+            return _top_indices(self.scores(vec), k)
+        slices = [self.slices[sr] for sr in dict.fromkeys(subreddits) if sr in self.slices]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        q = self._unit(vec)
+        sims = np.concatenate([self.matrix[sl] @ q for sl in slices])
+        rows = np.concatenate([np.arange(sl.start, sl.stop) for sl in slices])
+        return rows[_top_indices(sims, k)]
+
+    def search(self, vec, k: int, ef: Optional[int] = None, subreddits: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        # exact search: ef is accepted for interface parity and ignored
+        return [dict(self.posts[i]) for i in self.top_k(vec, k, subreddits)]
+
+    def search_lite(self, vec, k: int, ef: Optional[int] = None, subreddits: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        idx = self.top_k(vec, k, subreddits)
+        distances = 1.0 - self.matrix[idx] @ self._unit(vec)
+        return [
+            {field: self.posts[i].get(field) for field in LITE_FIELDS} | {"distance": float(d)}
+            for i, d in zip(idx, distances)
+        ]
+
+    def fetch(self, ids: List[str]) -> List[Dict[str, Any]]:
+        return [dict(self.posts[self.rows[i]]) for i in ids if i in self.rows]
+
+    def search_hybrid(self, text: str, vec, k: int, ef: Optional[int] = None) -> List[Dict[str, Any]]:
+        # exact search: ef is accepted for interface parity and ignored
+        depth = max(k, HYBRID_CANDIDATES)
+        rankings = [self.bm25.top_k(text, depth).tolist(), self.top_k(vec, depth).tolist()]
+        return [dict(self.posts[i]) for i in rrf_fuse(rankings, k)]
+
+
+def get_backend(name: str = SEARCH_BACKEND, db: Optional[helix.Client] = None):
+    if name == "helix":
+        return HelixBackend(db)
+    if name == "numpy":
+        return NumpyBackend.from_corpus()
+    raise ValueError(f"unknown search backend {name!r} (expected 'helix' or 'numpy')")
+
+
+_router_lock = threading.Lock()
+_routers: Dict[str, Optional[SubredditRouter]] = {}
+
+
+def get_router(root: str = EMBEDDINGS_DIR) -> Optional[SubredditRouter]:
+    """
+    The subreddit router stored with the embeddings, loaded once; None if not built yet.
+    """
+    with _router_lock:
+        if root not in _routers:
+            _routers[root] = SubredditRouter.load(root)
+            if _routers[root] is None:
+                print(f"[WARN] No subreddit router in {root}/ (built by insert_data.py with VECTORIZE), searching everything.")
+        return _routers[root]
+
+
+def retrieve(
+    backend,
+    text: str,
+    vec,
+    k: int,
+    mode: str = SEARCH_MODE,
+    ef: Optional[int] = None,
+    lite: bool = False,
+    subreddits: Optional[Sequence[str]] = None,
+    probes: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top-k posts for a query given as text and its embedding, ranked by mode.
+    ef sets the vector search effort in either mode (see clamp_ef). With lite,
+    vector mode returns only LITE_FIELDS and distance per hit; pass the hits to
+    hydrate() for bodies.
+    subreddits, if given, limits vector mode to posts from those subreddits.
+    Otherwise probes (ROUTER_PROBES if None) > 0 limits it to the subreddits the
+    router picks, falling back to searching everything if they hold fewer than k hits.
+    k is limited to MAX_K.
+    """
+    k = clamp_k(k)
+    if mode == "vector":
+        search = backend.search_lite if lite else backend.search
+        probes = ROUTER_PROBES if probes is None else probes
+        if subreddits is None and probes > 0:
+            router = get_router()
+            if router is not None and probes < len(router.subreddits):
+                hits = search(vec, k, ef, router.route(vec, probes))
+                if len(hits) >= k:
+                    return hits
+                metrics.observe("router_fallbacks", 1)
+        return search(vec, k, ef, subreddits)
+    if subreddits is not None:
+        raise ValueError(f"subreddit scope is only supported in vector mode, not {mode!r}")
+    if mode == "hybrid":
+        return backend.search_hybrid(text, vec, k, ef)
+    raise ValueError(f"unknown search mode {mode!r} (expected 'vector' or 'hybrid')")
+
+
+def hydrate(backend, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Full posts for hits, in order. Only hits without content are fetched, in one request.
+    """
+    missing = [h["id"] for h in hits if "content" not in h]
+    if not missing:
+        return hits
+    fetched = {post["id"]: post for post in backend.fetch(missing)}
+    return [h if "content" in h else {**fetched.get(h["id"], {}), **h} for h in hits]
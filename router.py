@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+CENTROIDS_FILE = "router.npy"
+LABELS_FILE = "router.json"
+CENTROIDS_PER_SUBREDDIT = 1  # >1 splits each subreddit into that many k-means clusters
+KMEANS_ITERATIONS = 20
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    k unit-length centroids of the (already normalized) rows of vectors, by cosine k-means.
+    """
+    k = min(k, len(vectors))
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)]
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        updated = np.stack([
+            vectors[assign == c].sum(axis=0) if np.any(assign == c) else centroids[c]
+            for c in range(k)
+        ])
+        updated = _normalize(updated)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return centroids
+
+
+class SubredditRouter:
+    """
+    IVF-style partition router: one or more centroids per subreddit, computed at
+    ingest from the stored post embeddings. route() names the subreddits whose
+    centroids are closest to a query, so search only has to look inside those.
+    Stored next to the embedding store as router.npy (centroids) and router.json
+    (the subreddit of each centroid).
+    """
+
+    def __init__(self, labels: List[str], centroids: np.ndarray):
+        if len(labels) != len(centroids):
+            raise ValueError(f"{len(labels)} labels for {len(centroids)} centroids")
+        self.labels = labels
+        self.centroids = _normalize(np.asarray(centroids, dtype=np.float32))
+        self.subreddits = list(dict.fromkeys(labels))
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        subreddits: Sequence[str],
+        per_subreddit: int = CENTROIDS_PER_SUBREDDIT,
+    ) -> SubredditRouter:
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        subreddits = np.asarray(subreddits)
+        labels: List[str] = []
+        parts = []
+        for sr in dict.fromkeys(subreddits.tolist()):
+            members = vectors[subreddits == sr]
+            if per_subreddit > 1:
+                centroids = spherical_kmeans(members, per_subreddit)
+            else:
+                centroids = _normalize(members.mean(axis=0, keepdims=True))
+            labels.extend([sr] * len(centroids))
+            parts.append(centroids)
+        dim = vectors.shape[1] if vectors.ndim == 2 else 0
+        return cls(labels, np.concatenate(parts) if parts else np.empty((0, dim), dtype=np.float32))
+
+    @classmethod
+    def load(cls, root: str | Path) -> Optional[SubredditRouter]:
+        """
+        The router stored at root, or None if none has been built there.
+        """
+        root = Path(root)
+        if not (root / LABELS_FILE).exists():
+            return None
+        with open(root / LABELS_FILE, encoding="utf-8") as f:
+            labels = json.load(f)["labels"]
+        return cls(labels, np.load(root / CENTROIDS_FILE))
+
+    def save(self, root: str | Path) -> None:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_centroids = root / (CENTROIDS_FILE + ".tmp")
+        tmp_labels = root / (LABELS_FILE + ".tmp")
+        with open(tmp_centroids, "wb") as f:
+            np.save(f, self.centroids)
+        with open(tmp_labels, "w", encoding="utf-8") as f:
+            json.dump({"labels": self.labels}, f)
+        os.replace(tmp_centroids, root / CENTROIDS_FILE)
+        os.replace(tmp_labels, root / LABELS_FILE)
+
+    def route(self, vec, probes: int) -> List[str]:
+        """
+        The probes subreddits whose nearest centroid is most similar to vec, best first.
+        """
+        q = np.asarray(vec, dtype=np.float32)
+        sims = self.centroids @ (q / max(float(np.linalg.norm(q)), 1e-12))
+        out: List[str] = []
+        for i in np.argsort(-sims, kind="stable"):
+            if self.labels[i] not in out:
+                out.append(self.labels[i])
+                if len(out) == probes:
+                    break
+        return out
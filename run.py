@@ -1,53 +1,39 @@
 #!/usr/bin/env python3
 
-from typing import List
-from insert_data import vectorize_text
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cache import CACHE_DIR, DiskCache
+from embedding import count_tokens, vectorize_text
+import llm
+from metrics import metrics
+from retrieval import SEARCH_MODE, get_backend, hydrate, retrieve
 import requests
-import helix
-import torch
-from transformers import AutoTokenizer, AutoModel
-
-db = helix.Client(local=True, verbose=True)
-
-tokenizer = AutoTokenizer.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-model = AutoModel.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"using device: {device}")
-model.to(device)
-model.eval()
-
-class search_posts_vec(helix.Query):
-    def __init__(
-        self,
-        query_vec: List[float],
-        k: int,
-    ):
-        super().__init__()
-        self.query_vec = query_vec
-        self.k = k
-
-    def query(self) -> List[helix.Payload]:
-        return [{
-            "query": self.query_vec,
-            "k": self.k,
-        }]
-
-    def response(self, response):
-        return response
-
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
-
-def get_ollama_response(prompt, model_name):
-    payload = {
-        "model": model_name,
-        "prompt": prompt,
-        "stream": False
-    }
-    response = requests.post(OLLAMA_API_URL, json=payload)
-    if response.status_code == 200:
-        return response.json()["response"]
-    else:
-        raise Exception(f"Ollama API request failed with status {response.status_code}")
+
+# Rephrasing makes the question read like a post before embedding. Hybrid search also
+# matches the question's keywords directly, so it skips that extra LLM call.
+REPHRASE = SEARCH_MODE == "vector"
+PROMPT_VERSION = 1 # bump whenever create_rephrase's template changes; old cache entries then miss
+REPHRASE_CACHE_PATH = CACHE_DIR / "rephrase.sqlite"
+REPHRASE_MIN_WORDS = 8 # shorter questions are searched as asked
+# seconds a rephrase generation may take before the question is searched as asked; None waits
+REPHRASE_BUDGET = float(os.environ["REPHRASE_BUDGET"]) if os.environ.get("REPHRASE_BUDGET") else None
+# comma-separated subreddits to search within (e.g. "selfhosted,docker"); unset searches all
+SUBREDDITS = [sr.strip() for sr in os.environ["SUBREDDITS"].split(",") if sr.strip()] if os.environ.get("SUBREDDITS") else None
+# tokens (embedding tokenizer) for all sources in the answer prompt; bounds prefill time
+CONTEXT_TOKENS = 1536
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)|\n")
+_WORD_END_RE = re.compile(r"\s+")
+
+def get_ollama_response(prompt, model_name, timeout: Optional[float] = None, on_token=None):
+    """
+    Generated text for prompt, streamed over the shared pooled client.
+    on_token, if given, is called with each piece of text as it arrives.
+    """
+    return llm.client.generate(prompt, model_name, on_token=on_token, timeout=timeout).text
 
 def create_rephrase(text: str) -> str:
     prompt_template = f"""<instructions>
@@ -67,26 +53,162 @@ def create_rephrase(text: str) -> str:
     """
     return prompt_template
 
-def create_prompt(out: list, query: str) -> str:
-    formatted_context = ""
-    subreddits = set()
-    urls = []
+class RephraseCache:
+    """
+    Rephrased questions in a SQLite file, keyed by model, PROMPT_VERSION and the
+    question with case and whitespace normalized, so near-repeats hit too.
+    """
+
+    def __init__(self, path=REPHRASE_CACHE_PATH):
+        self.disk = DiskCache(path)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, question: str) -> str:
+        normalized = " ".join(question.lower().split())
+        return hashlib.sha1(f"{model}\0{PROMPT_VERSION}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, question: str) -> Optional[str]:
+        raw = self.disk.get(self.key(model, question))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return raw.decode("utf-8")
+
+    def put(self, model: str, question: str, text: str) -> None:
+        self.disk.put(self.key(model, question), text.encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+rephrase_cache = RephraseCache()
+
+def rephrase(question: str, model: str, budget: Optional[float] = REPHRASE_BUDGET) -> Tuple[str, str]:
+    """
+    Text to search with for question, and where it came from: "short" (searched as
+    asked), "cache", "llm", or "budget" (generation outran budget seconds, searched as asked).
+    """
+    if len(question.split()) < REPHRASE_MIN_WORDS:
+        return question, "short"
+    cached = rephrase_cache.get(model, question)
+    if cached is not None:
+        return cached, "cache"
+    try:
+        text = get_ollama_response(create_rephrase(question), model, timeout=budget)
+    except requests.Timeout:
+        print(f"[WARN] Rephrase took longer than {budget}s, searching with the question as asked.")
+        return question, "budget"
+    rephrase_cache.put(model, question, text)
+    return text, "llm"
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return "  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+
+def _fit(text: str, budget: int) -> Tuple[str, int]:
+    """
+    Longest prefix of text within budget tokens that ends at a sentence boundary,
+    or at a word boundary if not even the first sentence fits. Returns it with its token count.
+    """
+    if budget <= 0 or not text:
+        return "", 0
+    total = count_tokens([text])[0]
+    if total <= budget:
+        return text, total
+    for boundary in (_SENTENCE_END_RE, _WORD_END_RE):
+        cuts = [m.end() for m in boundary.finditer(text)]
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts)]
+        used = end = 0
+        for cut, n in zip(cuts, count_tokens(pieces)):
+            if used + n > budget:
+                break
+            used, end = used + n, cut
+        if end:
+            return text[:end].rstrip(), used
+    return "", 0
+
+def pack_context(out: list, budget: int = CONTEXT_TOKENS) -> Tuple[str, Dict[str, Any]]:
+    """
+    The sources block of the prompt, within budget tokens. Source headers, labels and
+    separators are always kept, so their tokens are reserved first; the rest is shared
+    out in rank order, each source getting a share of what is left proportional to
+    1/rank, so unused budget rolls over to lower-ranked sources. Content is cut at
+    sentence boundaries, then whole comments are added while they fit. Only headers
+    alone can exceed the budget; the report then has over_budget set.
+    """
+    weights = [1.0 / rank for rank in range(1, len(out) + 1)]
+    separator = "-" * 80 + "\n\n"
+    headers = [
+        f"Source {idx}: {post.get('title', 'N/A')}\nSubreddit: r/{post.get('subreddit', 'N/A')}\n"
+        for idx, post in enumerate(out, 1)
+    ]
+    # fixed text per source, including the " [...]" that marks cut content
+    overheads = count_tokens([h + "Content:  [...]\nComments:\n" + separator for h in headers])
+    blocks = []
+    sources = []
+    remaining = max(0, budget - sum(overheads))
 
-    for idx, post in enumerate(out, 1):
-        title = post.get("title", "N/A")
-        subreddit = post.get("subreddit", "N/A")
-        content = post.get("content", "N/A")
-        comments = post.get("comments", "N/A")
-        url = post.get("url", "N/A")
+    for idx, (post, header, overhead) in enumerate(zip(out, headers, overheads), 1):
+        share = int(remaining * weights[idx - 1] / sum(weights[idx - 1:]))
+        content = post.get("content") or "N/A"
+        comments = post.get("comments") or []
+        if isinstance(comments, str):
+            comments = [comments]
 
-        formatted_context += f"Source {idx}: {title}\n"
-        formatted_context += f"Subreddit: r/{subreddit}\n"
-        formatted_context += f"Content: {content}\n"
-        formatted_context += f"Comments: {comments}i\n"
-        formatted_context += "-" * 80 + "\n\n"
+        kept_content, used = _fit(content, share)
+        truncated = kept_content != content
+        if truncated:
+            kept_content += " [...]"
 
-        subreddits.add(subreddit)
-        urls.append(url)
+        lines = [f"- {c}\n" for c in comments]
+        kept_lines = []
+        for line, n in zip(lines, count_tokens(lines)):
+            if used + n > share:
+                break
+            kept_lines.append(line)
+            used += n
+
+        blocks.append(header)
+        blocks.append(f"Content: {kept_content}\n")
+        blocks.append("Comments:\n")
+        blocks.extend(kept_lines)
+        blocks.append(separator)
+
+        remaining = max(0, remaining - used)
+        sources.append({
+            "rank": idx,
+            "budget": overhead + share,
+            "tokens": overhead + used,
+            "content_truncated": truncated,
+            "comments_kept": len(kept_lines),
+            "comments_total": len(lines),
+        })
+
+    context_tokens = sum(src["tokens"] for src in sources)
+    report = {
+        "budget": budget,
+        "context_tokens": context_tokens,
+        "overhead_tokens": sum(overheads),
+        "over_budget": context_tokens > budget,
+        "sources": sources,
+    }
+    if report["over_budget"]:
+        print(f"[WARN] Source headers alone take {sum(overheads)} tokens, over the {budget}-token context budget.")
+    return "".join(blocks), report
+
+def build_prompt(out: list, query: str, budget: int = CONTEXT_TOKENS) -> Tuple[str, Dict[str, Any]]:
+    """
+    The answer prompt plus a report of its token counts (see pack_context).
+    Every source URL is listed, however much of the source itself fit.
+    """
+    formatted_context, report = pack_context(out, budget)
+    subreddits = set()
+    urls = []
+
+    for post in out:
+        subreddits.add(post.get("subreddit", "N/A"))
+        urls.append(post.get("url", "N/A"))
 
     subreddit_recs = ", ".join([f"r/{sub}" for sub in list(subreddits)[:3]])
 
@@ -127,24 +249,93 @@ def create_prompt(out: list, query: str) -> str:
         subreddits=subreddit_recs,
         urls=urls_section
     )
-    return prompt
+    report["prompt_tokens"] = count_tokens([prompt])[0]
+    return prompt, report
+
+def create_prompt(out: list, query: str, budget: int = CONTEXT_TOKENS) -> str:
+    return build_prompt(out, query, budget)[0]
+
+def format_prompt_report(report: Dict[str, Any]) -> str:
+    sources = ", ".join(
+        f"#{src['rank']} {src['tokens']}/{src['budget']}"
+        + (" cut" if src["content_truncated"] else "")
+        + f" {src['comments_kept']}/{src['comments_total']} comments"
+        for src in report["sources"]
+    )
+    return (
+        f"{report['prompt_tokens']} tokens, context {report['context_tokens']}/{report['budget']}"
+        + (" over budget" if report["over_budget"] else "")
+        + f" ({sources})"
+    )
+
+# the fast tokenizer refuses concurrent use from several threads, so embedding,
+# search and prompt packing (milliseconds next to a generation) run one at a time
+_retrieval_lock = threading.Lock()
+
+def answer_question(
+    backend,
+    model: str,
+    q: str,
+    n: int = 4,
+    on_token: Optional[Callable[[str], None]] = None,
+    subreddits: Optional[List[str]] = SUBREDDITS,
+) -> Dict[str, Any]:
+    """
+    Rephrase, embed, search (within subreddits, if given), pack and generate, timing
+    every stage into metrics. Returns a record of what each stage produced.
+    """
+    timings = {}
+    with metrics.timer("rephrase", into=timings):
+        search_text, source = rephrase(q, model) if REPHRASE else (q, "off")
+
+    with _retrieval_lock:
+        with metrics.timer("embed", into=timings):
+            vec = vectorize_text(search_text)
+        with metrics.timer("search", into=timings):
+            hits = retrieve(backend, search_text, vec, n, lite=True, subreddits=subreddits)[:n]
+        with metrics.timer("fetch", into=timings):
+            # ['subreddit', 'title', 'content', 'url', 'comments']
+            out = hydrate(backend, hits)
+        with metrics.timer("prompt", into=timings):
+            prompt, prompt_report = build_prompt(out, q)
+
+    with metrics.timer("answer", into=timings):
+        answer = llm.client.generate(prompt, model, on_token=on_token)
+
+    metrics.observe("retrieved_posts", len(out))
+    metrics.observe("prompt_tokens", prompt_report["prompt_tokens"])
+    metrics.observe("prompt_bytes", len(prompt.encode("utf-8")))
+    metrics.observe("answer_tokens", answer.tokens)
+    metrics.observe("answer_tokens_per_second", answer.tokens_per_second)
+    if answer.first_token is not None:
+        metrics.observe("answer_first_token_seconds", answer.first_token)
+
+    return {
+        "model": model,
+        "question": q,
+        "rephrase_source": source,
+        "search_text": search_text,
+        "posts": [p.get("id") or p.get("url") for p in out],
+        "prompt": prompt,
+        "prompt_tokens": prompt_report,
+        "answer": answer.text,
+        "timings": timings,
+        "first_token": answer.first_token,
+        "tokens_per_second": answer.tokens_per_second,
+        "summary": answer.summary(),
+    }
 
 if __name__ == "__main__":
     model = "llama3.2:3b"
     q = input("prompt: ")
     n = 4
 
-    text_prompt = create_rephrase(q)
-    res = get_ollama_response(text_prompt, model)
-
-    vec = vectorize_text(res)
-    res = db.query(search_posts_vec(vec, n))
-
-    # ['subreddit', 'title', 'content', 'url', 'comments']
-    out = [o for o in res[0]["posts"][:n]]
-
-    prompt = create_prompt(out, q)
+    backend = get_backend()
 
     print("-----------------------")
-    res = get_ollama_response(prompt, model)
-    print(res)
+    record = answer_question(backend, model, q, n, on_token=lambda piece: print(piece, end="", flush=True))
+    print("\n-----------------------")
+    print(f"[INFO] prompt: {format_prompt_report(record['prompt_tokens'])}")
+    print(f"[INFO] rephrase: {record['rephrase_source']}  {format_timings(record['timings'])}")
+    print(f"[INFO] answer: {record['summary']}")
+    metrics.dump()
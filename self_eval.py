@@ -1,18 +1,27 @@
-from insert_data import vectorize_text
-import helix
-import torch
-from transformers import AutoTokenizer, AutoModel
+#!/usr/bin/env python3
+"""
+Answer every question with every model, for manual scoring.
 
-from run import search_posts_vec, get_ollama_response, create_rephrase, create_prompt
+    python self_eval.py                               # interactive, one answer at a time
+    python self_eval.py --batch results.jsonl [--concurrency 2]
 
-db = helix.Client(local=True, verbose=True)
+--batch runs the full models x questions matrix without prompting and appends one
+JSON record per answer (rephrase, retrieved posts, prompt, answer, stage timings).
+Pairs already answered in the file are skipped, so a killed run picks up where it
+stopped. Models run one after another; --concurrency bounds the requests in flight
+per model (Ollama serves up to OLLAMA_NUM_PARALLEL of them at once).
+"""
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Set, Tuple
 
-tokenizer = AutoTokenizer.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-model = AutoModel.from_pretrained("mixedbread-ai/mxbai-embed-large-v1")
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"using device: {device}")
-model.to(device)
-model.eval()
+from metrics import metrics
+from retrieval import get_backend
+
+from run import answer_question, format_prompt_report, format_timings, rephrase_cache
 
 models = ["llama3.2:3b", "mistral:7b"]
 questions = [
@@ -43,28 +52,93 @@ questions = [
 
 n = 4
 
-for model in models:
-    for q in questions:
-        print(f"q: {q}")
-        text_prompt = create_rephrase(q)
-        #print(text_prompt)
-        res = get_ollama_response(text_prompt, model)
-        #print("----------")
-        #print(res)
+def load_done(path: str) -> Set[Tuple[str, str]]:
+    """
+    (model, question) pairs already answered in a results file. A torn last line
+    from a killed run is ignored, and records with an error are retried.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                done.add((record["model"], record["question"]))
+    return done
+
+
+def run_batch(backend, path: str, concurrency: int) -> None:
+    done = load_done(path)
+    todo = [(model, q) for model in models for q in questions if (model, q) not in done]
+    print(f"[INFO] {len(done)} answers already in {path}, {len(todo)} to go.")
+
+    torn = False
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+
+    write_lock = threading.Lock()
+    with open(path, "a", encoding="utf-8") as f:
+        if torn:
+            # a killed run left a partial line; start on a fresh one
+            f.write("\n")
+
+        def work(model: str, q: str) -> None:
+            try:
+                record = answer_question(backend, model, q, n)
+            except Exception as e:
+                record = {"model": model, "question": q, "error": f"{type(e).__name__}: {e}"}
+                print(f"[WARN] {model}: {record['error']}")
+            with write_lock:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if "error" not in record:
+                print(f"[INFO] {model}: {format_timings(record['timings'])}  {q[:60]}")
+
+        for model in models:
+            pending = [q for m, q in todo if m == model]
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                for future in [pool.submit(work, model, q) for q in pending]:
+                    future.result()
+
+    print(f"[INFO] rephrase cache {rephrase_cache.stats()}")
+
+
+def run_interactive(backend) -> None:
+    for model in models:
+        for q in questions:
+            print(f"q: {q}")
+            print("-----------------------")
+            record = answer_question(backend, model, q, n, on_token=lambda piece: print(piece, end="", flush=True))
+            print()
+            print(f"[INFO] prompt: {format_prompt_report(record['prompt_tokens'])}")
+            print(f"[INFO] rephrase: {record['rephrase_source']}  {format_timings(record['timings'])}  cache {rephrase_cache.stats()}")
+            print(f"[INFO] answer: {record['summary']}")
+
+            input("press enter for next question...")
 
-        vec = vectorize_text(res)
-        res = db.query(search_posts_vec(vec, n))
-        #pprint(res)
 
-        # ['subreddit', 'title', 'content', 'url', 'comments']
-        out = [o for o in res[0]["posts"][:n]]
-        #print(out)
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", metavar="RESULTS_JSONL", help="run headless, appending answers to this file")
+    ap.add_argument("--concurrency", type=int, default=2, help="requests in flight per model in batch mode")
+    args = ap.parse_args()
 
-        prompt = create_prompt(out, q)
-        #print(prompt)
+    backend = get_backend()
+    try:
+        if args.batch:
+            run_batch(backend, args.batch, args.concurrency)
+        else:
+            run_interactive(backend)
+    finally:
+        metrics.dump()
 
-        print("-----------------------")
-        res = get_ollama_response(prompt, model)
-        print(res)
 
-        input("press enter for next question...")
+if __name__ == "__main__":
+    main()